@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Benchmarks import the generator's modules the same way src/main.py does.
+SRC_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
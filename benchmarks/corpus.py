@@ -0,0 +1,128 @@
+import argparse
+import os
+import random
+
+
+DEFAULT_MIX = {
+    "heading": 2,
+    "paragraph": 6,
+    "unordered_list": 2,
+    "ordered_list": 1,
+    "code": 1,
+    "quote": 1,
+}
+
+WORDS = (
+    "shire hobbit ring mordor elf dwarf wizard river mountain forest road tower "
+    "king steward horse sword song lore map journey fellowship council gate"
+).split()
+
+TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet">
+</head>
+<body>
+    <article>
+        {{ Content }}
+    </article>
+</body>
+</html>
+"""
+
+
+class CorpusGenerator:
+    def __init__(self, seed=0, mix=None, blocks_per_page=40, link_rate=0.3, image_rate=0.05):
+        self.random = random.Random(seed)
+        self.mix = mix or DEFAULT_MIX
+        self.blocks_per_page = blocks_per_page
+        self.link_rate = link_rate
+        self.image_rate = image_rate
+
+    def page(self, index):
+        blocks = [f"# Page {index}"]
+        kinds = list(self.mix)
+        weights = [self.mix[kind] for kind in kinds]
+        for _ in range(self.blocks_per_page):
+            kind = self.random.choices(kinds, weights)[0]
+            blocks.append(getattr(self, kind)())
+        return "\n\n".join(blocks) + "\n"
+
+    def words(self, count):
+        return " ".join(self.random.choice(WORDS) for _ in range(count))
+
+    def inline(self, count):
+        parts = []
+        for _ in range(count):
+            roll = self.random.random()
+            if roll < self.link_rate:
+                parts.append(f"[{self.words(2)}](/{self.random.choice(WORDS)}/{self.random.randrange(1000)})")
+            elif roll < self.link_rate + self.image_rate:
+                parts.append(f"![{self.words(2)}](/images/{self.random.choice(WORDS)}.png)")
+            elif roll < 0.55:
+                parts.append(f"**{self.words(2)}**")
+            elif roll < 0.65:
+                parts.append(f"*{self.words(2)}*")
+            elif roll < 0.7:
+                parts.append(f"`{self.random.choice(WORDS)}()`")
+            else:
+                parts.append(self.words(self.random.randint(3, 12)))
+        return " ".join(parts)
+
+    def heading(self):
+        return "#" * self.random.randint(2, 4) + " " + self.words(4)
+
+    def paragraph(self):
+        return "\n".join(self.inline(self.random.randint(3, 8)) for _ in range(self.random.randint(1, 4)))
+
+    def unordered_list(self):
+        return "\n".join(f"- {self.inline(2)}" for _ in range(self.random.randint(2, 8)))
+
+    def ordered_list(self):
+        return "\n".join(f"{i + 1}. {self.inline(2)}" for i in range(self.random.randint(2, 8)))
+
+    def code(self):
+        lines = [f"{self.random.choice(WORDS)} = {self.random.randrange(100)}" for _ in range(self.random.randint(2, 10))]
+        return "```\n" + "\n".join(lines) + "\n```"
+
+    def quote(self):
+        return "\n".join(f"> {self.inline(2)}" for _ in range(self.random.randint(1, 4)))
+
+
+def parse_mix(text):
+    # "heading=2,paragraph=6" -> {"heading": 2, "paragraph": 6}
+    mix = {}
+    for item in text.split(","):
+        kind, _, weight = item.partition("=")
+        if kind not in DEFAULT_MIX:
+            raise Exception(f"Unknown block kind in mix: {kind}")
+        mix[kind] = float(weight)
+    return mix
+
+
+def generate_corpus(root, pages=100, seed=0, pages_per_section=50, **options):
+    # Writes content/ and template.html under root; the same arguments always give the same files.
+    generator = CorpusGenerator(seed=seed, **options)
+    content_path = os.path.join(root, "content")
+    for index in range(pages):
+        page_dir = os.path.join(content_path, f"section-{index // pages_per_section}", f"page-{index}")
+        os.makedirs(page_dir, exist_ok=True)
+        with open(os.path.join(page_dir, "index.md"), "w") as file:
+            file.write(generator.page(index))
+
+    template_path = os.path.join(root, "template.html")
+    with open(template_path, "w") as file:
+        file.write(TEMPLATE)
+    return content_path, template_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic markdown corpus")
+    parser.add_argument("root", help="Directory to write content/ and template.html into")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--blocks-per-page", type=int, default=40)
+    parser.add_argument("--mix", type=parse_mix, help="Block weights, e.g. heading=2,paragraph=6,code=1")
+    args = parser.parse_args()
+    generate_corpus(args.root, args.pages, args.seed, blocks_per_page=args.blocks_per_page, mix=args.mix)
@@ -0,0 +1,57 @@
+import sys
+import timeit
+
+from inline_markdown import (
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    text_to_textnodes,
+)
+from textnode import TextNode, TextType
+
+
+def multi_pass_text_to_textnodes(text):
+    # The five-pass pipeline text_to_textnodes used before the single-pass scanner.
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_link(nodes)
+    nodes = split_nodes_image(nodes)
+    return nodes
+
+
+SAMPLES = {
+    "prose": "This is **bold** text with an *italic* word and a `code span`. " * 20,
+    "link_heavy": " ".join(f"see [link {i}](/page/{i}) and ![image {i}](/img/{i}.png)" for i in range(4000)),
+    "plain": "Just some plain text without any markup at all. " * 200,
+}
+# Text that opens links without closing them; the scan must stay linear in its length.
+UNCLOSED = {"unclosed_link_text": "[a ", "unclosed_link_url": "[a](", "unclosed_image_text": "![a "}
+SCALING_SIZES = (2000, 4000, 8000, 16000)
+
+
+def scaling(number):
+    for name, unit in UNCLOSED.items():
+        times = []
+        for size in SCALING_SIZES:
+            text = unit * size
+            times.append(min(timeit.repeat(lambda: text_to_textnodes(text), number=number, repeat=3)) / number)
+        steps = "  ".join(f"{size:>6}: {seconds * 1e3:8.3f} ms" for size, seconds in zip(SCALING_SIZES, times))
+        # Doubling the input should roughly double the time; quadratic scans show 4x.
+        print(f"{name:>20}: {steps}  ({times[-1] / times[-2]:4.1f}x per doubling)")
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    for name, text in SAMPLES.items():
+        if multi_pass_text_to_textnodes(text) != text_to_textnodes(text):
+            raise Exception(f"Tokenizers disagree on sample {name}")
+        old = min(timeit.repeat(lambda: multi_pass_text_to_textnodes(text), number=number, repeat=3))
+        new = min(timeit.repeat(lambda: text_to_textnodes(text), number=number, repeat=3))
+        print(f"{name:>12}: multi-pass {old / number * 1e3:8.3f} ms  single-pass {new / number * 1e3:8.3f} ms  ({old / new:5.1f}x)")
+    scaling(max(1, number // 10))
+
+
+if __name__ == "__main__":
+    main()
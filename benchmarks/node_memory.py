@@ -0,0 +1,79 @@
+import sys
+import tracemalloc
+
+import inline_markdown
+import markdown_blocks
+import textnode
+from htmlnode import count_nodes
+
+
+class DictHTMLNode:
+    # The node layout before __slots__: a per-instance __dict__ and no interning.
+    def __init__(self, tag = None, value = None, children = None, props = None):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+
+class DictLeafNode(DictHTMLNode):
+    def __init__(self, tag, value, props = None):
+        super().__init__(tag, value, None, props)
+
+
+class DictParentNode(DictHTMLNode):
+    def __init__(self, tag, children, props = None):
+        super().__init__(tag, None, children, props)
+
+
+class DictTextNode:
+    def __init__(self, text, text_type, url = None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+def synthetic_document(blocks):
+    parts = []
+    for i in range(blocks):
+        parts.append(f"## Section {i}")
+        parts.append(f"Paragraph {i} with **bold**, *italic*, `code` and a [link](/page/{i}).")
+        parts.append(f"* item {i}\n* another *item*\n* a third [item](/x/{i})")
+        parts.append(f"> quoted line {i}\n> another quoted line")
+    return "\n\n".join(parts)
+
+
+def measure(markdown):
+    tracemalloc.start()
+    tree = markdown_blocks.markdown_to_html_node(markdown)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return tree, size
+
+
+def patch_dict_nodes():
+    markdown_blocks.ParentNode = DictParentNode
+    textnode.LeafNode = DictLeafNode
+    textnode.TextNode = DictTextNode
+    inline_markdown.TextNode = DictTextNode
+
+
+def main():
+    blocks = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    markdown = synthetic_document(blocks)
+
+    slotted_tree, slotted_size = measure(markdown)
+    nodes = count_nodes(slotted_tree)
+    del slotted_tree
+
+    patch_dict_nodes()
+    _, dict_size = measure(markdown)
+
+    print(f"{nodes} HTML nodes from {len(markdown)} bytes of markdown")
+    print(f"  __dict__ nodes: {dict_size / 1e6:8.2f} MB  ({dict_size / nodes:6.1f} B/node)")
+    print(f"  __slots__ nodes: {slotted_size / 1e6:7.2f} MB  ({slotted_size / nodes:6.1f} B/node)")
+    print(f"  saving: {(dict_size - slotted_size) / nodes:.1f} B/node ({1 - slotted_size / dict_size:.0%})")
+
+
+if __name__ == "__main__":
+    main()
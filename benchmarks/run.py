@@ -0,0 +1,145 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import generate_corpus, parse_mix
+from inline_markdown import text_to_textnodes
+from main import Site, build, parse_args
+from markdown_blocks import block_to_html_node, iter_blocks
+from page_generation import parse_page
+
+
+def best_of(repeat, function, setup=None):
+    # setup, if given, runs untimed before each repeat.
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run_benchmarks(pages=200, seed=0, repeat=5, mix=None):
+    with tempfile.TemporaryDirectory() as root:
+        content_path, template_path = generate_corpus(root, pages, seed, mix=mix)
+        documents = []
+        for dir_path, _, file_names in sorted(os.walk(content_path)):
+            for name in sorted(file_names):
+                with open(os.path.join(dir_path, name)) as file:
+                    documents.append(file.read())
+
+        typed_blocks = [typed_block for document in documents for typed_block in iter_blocks(io.StringIO(document))]
+        blocks = [block for _, block in typed_blocks]
+        trees = [block_to_html_node(block, block_type) for block_type, block in typed_blocks]
+
+        site = Site(root)
+        os.makedirs(site.static_path)
+        with open(os.path.join(site.static_path, "index.css"), "w") as file:
+            file.write("body { margin: 0 }")
+        args = parse_args([])
+
+        def clean():
+            # Start every timed build from nothing: no output, manifest or fragment cache.
+            for path in (site.public_path, os.path.dirname(site.cache_path)):
+                if os.path.exists(path):
+                    shutil.rmtree(path)
+            if os.path.exists(site.manifest_path):
+                os.remove(site.manifest_path)
+
+        def run_build():
+            with contextlib.redirect_stdout(io.StringIO()):
+                build(args, site)
+
+        stages = {
+            "iter_blocks": best_of(repeat, lambda: [list(iter_blocks(io.StringIO(document))) for document in documents]),
+            "block_to_html_node": best_of(
+                repeat, lambda: [block_to_html_node(block, block_type) for block_type, block in typed_blocks]
+            ),
+            "text_to_textnodes": best_of(repeat, lambda: [text_to_textnodes(block) for block in blocks]),
+            "to_html": best_of(repeat, lambda: [tree.to_html() for tree in trees]),
+            # Title scan, then parsing and rendering the content as one stream.
+            "parse_page": best_of(
+                repeat, lambda: [parse_page(io.StringIO(document))[1].to_html() for document in documents]
+            ),
+            "build": best_of(repeat, run_build, setup=clean),
+            # A second build with nothing changed: manifest checks only.
+            "build_unchanged": best_of(repeat, run_build),
+        }
+
+    return {
+        "meta": {
+            "pages": pages,
+            "seed": seed,
+            "repeat": repeat,
+            "blocks": len(blocks),
+            "markdown_bytes": sum(len(document) for document in documents),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "stages": stages,
+    }
+
+
+def compare(results, baseline, threshold, min_delta=0.001):
+    # Returns the stages that got slower than the baseline by more than threshold.
+    # Differences under min_delta seconds are treated as timer noise.
+    regressions = []
+    print(f"{'stage':<26}{'baseline':>12}{'current':>12}{'change':>10}")
+    for stage, seconds in results["stages"].items():
+        before = baseline["stages"].get(stage)
+        if before is None:
+            print(f"{stage:<26}{'-':>12}{seconds * 1000:>10.2f}ms{'new':>10}")
+            continue
+        change = seconds / before - 1
+        regressed = change > threshold and seconds - before > min_delta
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{stage:<26}{before * 1000:>10.2f}ms{seconds * 1000:>10.2f}ms{change:>+10.1%}{flag}")
+        if regressed:
+            regressions.append(stage)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the static site generator")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--mix", type=parse_mix, help="Block weights, e.g. heading=2,paragraph=6,code=1")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against results stored in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown before failing, e.g. 0.10")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore slowdowns smaller than this")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results to --baseline instead of comparing")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.pages, args.seed, args.repeat, args.mix)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline["meta"]["pages"] != results["meta"]["pages"] or baseline["meta"]["seed"] != results["meta"]["seed"]:
+            print("Warning: baseline was recorded with a different corpus")
+        if compare(results, baseline, args.threshold, args.min_delta_ms / 1000):
+            sys.exit(1)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,313 @@
 import os
+import sys
+import json
 import argparse
+import shlex
+import selectors
+import socket
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from http.server import HTTPServer, SimpleHTTPRequestHandler
+from io import BytesIO
+
+
+LIVE_RELOAD_PATH = "/__livereload"
+LIVE_RELOAD_SCRIPT = (
+    b'<script>new EventSource("' + LIVE_RELOAD_PATH.encode() + b'").onmessage = () => location.reload();</script>'
+)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class LiveReload:
+    def __init__(self):
+        self.generation = 0
+        # Set by close, which wakes every waiting event stream so it can end.
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.generation += 1
+            self.condition.notify_all()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def wait(self, generation, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.closed or self.generation != generation, timeout)
+            return self.generation
+
+
+class FingerprintMap:
+    # URL paths of the fingerprinted assets written by the last build, read from its
+    # manifest. The manifest is re-checked at most once per recheck_after seconds, and only
+    # re-read when a build has replaced it.
+    def __init__(self, manifest_path, recheck_after=1.0):
+        self.manifest_path = manifest_path
+        self.recheck_after = recheck_after
+        self.paths = frozenset()
+        self.mtime = None
+        self.checked = None
+        self.lock = threading.Lock()
+
+    def __contains__(self, url_path):
+        now = time.monotonic()
+        if self.checked is None or now - self.checked > self.recheck_after:
+            with self.lock:
+                self._reload()
+                self.checked = now
+        return url_path in self.paths
+
+    def _reload(self):
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            self.paths, self.mtime = frozenset(), None
+            return
+        if mtime == self.mtime:
+            return
+        with open(self.manifest_path, "r") as file:
+            fingerprints = json.load(file).get("fingerprints", {})
+        self.paths = frozenset("/" + name for name in fingerprints.values())
+        self.mtime = mtime
+
+
+class CacheEntry:
+    __slots__ = ("data", "content_type", "encoding", "vary", "last_modified", "immutable", "mtimes", "checked")
+
+    def __init__(self, data, content_type, encoding, vary, last_modified, immutable, mtimes):
+        self.data = data
+        self.content_type = content_type
+        self.encoding = encoding
+        self.vary = vary
+        self.last_modified = last_modified
+        self.immutable = immutable
+        self.mtimes = mtimes
+        self.checked = time.monotonic()
+
+
+class FileCache:
+    # Size-bounded LRU of small response bodies. Entries are re-checked against their
+    # files' mtimes at most once per revalidate_after seconds, so hot files need no stat.
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_file_size=1024 * 1024, revalidate_after=1.0):
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self.revalidate_after = revalidate_after
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            now = time.monotonic()
+            if now - entry.checked > self.revalidate_after:
+                if not self._is_current(entry):
+                    self._remove(key)
+                    return None
+                entry.checked = now
+            self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        if len(entry.data) > self.max_file_size:
+            return
+        with self.lock:
+            self._remove(key)
+            self.entries[key] = entry
+            self.size += len(entry.data)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry.data)
+
+    def _is_current(self, entry):
+        for path, mtime in entry.mtimes.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return False
+            except FileNotFoundError:
+                return False
+        return True
+
+
+class ThreadPoolHTTPServer(HTTPServer):
+    # Handles requests on a bounded pool of worker threads. A connection only holds a worker
+    # while a request is being read or answered; between requests it waits on one selector
+    # thread, so idle keep-alive clients cannot starve the pool.
+    request_queue_size = 128
+    # Seconds a connection may wait for its next request before it is closed.
+    idle_timeout = 15
+
+    def __init__(self, server_address, handler_class, workers=16, live_reload=None):
+        super().__init__(server_address, handler_class)
+        # Closed along with the server, so open event streams do not hold their workers.
+        self.live_reload = live_reload
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="http")
+        self.selector = selectors.DefaultSelector()
+        # Connections handed back by workers, registered by the idle thread itself.
+        self.parked = deque()
+        self.idle = {}
+        # Connections being handled by a worker; closing the server shuts them down so the
+        # workers, which the interpreter waits for on exit, are not left blocked on them.
+        self.active = set()
+        self.active_lock = threading.Lock()
+        self.closed = False
+        self.wake_reader, self.wake_writer = socket.socketpair()
+        self.selector.register(self.wake_reader, selectors.EVENT_READ)
+        self.idle_thread = threading.Thread(target=self.watch_idle, name="http-idle", daemon=True)
+        self.idle_thread.start()
+
+    def process_request(self, request, client_address):
+        # New connections wait for their first request like any idle one.
+        self.park(request, client_address, None)
+
+    def park(self, request, client_address, handler):
+        self.parked.append((request, client_address, handler))
+        self.wake()
+
+    def wake(self):
+        try:
+            self.wake_writer.send(b"\0")
+        except OSError:
+            pass
+
+    def watch_idle(self):
+        while not self.closed:
+            for key, _ in self.selector.select(timeout=1.0):
+                if key.fileobj is self.wake_reader:
+                    self.wake_reader.recv(4096)
+                    continue
+                self.selector.unregister(key.fileobj)
+                client_address, handler, _ = self.idle.pop(key.fileobj)
+                self.executor.submit(self.process_request_thread, key.fileobj, client_address, handler)
+            now = time.monotonic()
+            while self.parked:
+                request, client_address, handler = self.parked.popleft()
+                self.selector.register(request, selectors.EVENT_READ)
+                self.idle[request] = (client_address, handler, now + self.idle_timeout)
+            for request, (_, _, deadline) in list(self.idle.items()):
+                if deadline < now:
+                    self.selector.unregister(request)
+                    del self.idle[request]
+                    self.shutdown_request(request)
+
+    def process_request_thread(self, request, client_address, handler=None):
+        with self.active_lock:
+            self.active.add(request)
+        try:
+            if handler is None:
+                handler = self.RequestHandlerClass(request, client_address, self)
+            else:
+                handler.resume()
+            if getattr(handler, "parked", False) and not self.closed:
+                self.park(request, client_address, handler)
+                return
+        except Exception:
+            # Errors from connections cut off by server_close are expected.
+            if not self.closed:
+                self.handle_error(request, client_address)
+        finally:
+            with self.active_lock:
+                self.active.discard(request)
+        self.shutdown_request(request)
+
+    def server_close(self):
+        if self.closed:
+            return
+        super().server_close()
+        self.closed = True
+        if self.live_reload is not None:
+            self.live_reload.close()
+        self.wake()
+        self.idle_thread.join()
+        for request in self.idle:
+            self.shutdown_request(request)
+        self.idle.clear()
+        with self.active_lock:
+            active = list(self.active)
+        for request in active:
+            # Wakes a worker blocked reading or writing; the worker itself closes the socket.
+            try:
+                request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.selector.close()
+        self.wake_reader.close()
+        self.wake_writer.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
 
 
 class CORSHTTPRequestHandler(SimpleHTTPRequestHandler):
+    # Under a ThreadPoolHTTPServer the handler speaks HTTP/1.1, answers the requests that have
+    # arrived and then parks the connection with the server; the timeout only bounds reading a
+    # request that has started. Other servers get HTTP/1.0 and close after each response, since
+    # a kept-alive client would hold their only thread.
+    timeout = 15
+    parked = False
+
+    # Set to a LiveReload instance to inject the reload script and serve the event stream.
+    live_reload = None
+    vary_encoding = False
+    immutable = False
+    # Set to a FileCache instance to serve small files from memory.
+    file_cache = None
+    # Set to a FingerprintMap to mark the build's fingerprinted assets as immutable.
+    fingerprints = None
+
+    def handle(self):
+        if not hasattr(self.server, "park"):
+            super().handle()
+            return
+        self.protocol_version = "HTTP/1.1"
+        self.parked = False
+        self.close_connection = True
+        self.handle_one_request()
+        # Pipelined requests already buffered would never wake the selector.
+        while not self.close_connection and self.has_buffered_request():
+            self.handle_one_request()
+        self.parked = not self.close_connection
+
+    def resume(self):
+        try:
+            self.handle()
+        finally:
+            self.finish()
+
+    def finish(self):
+        if self.parked:
+            self.wfile.flush()
+            return
+        super().finish()
+
+    def has_buffered_request(self):
+        self.connection.setblocking(False)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
     def end_headers(self):
+        if self.vary_encoding:
+            self.send_header("Vary", "Accept-Encoding")
+        self.vary_encoding = False
+        if self.immutable:
+            self.send_header("Cache-Control", IMMUTABLE_CACHE_CONTROL)
+        self.immutable = False
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Methods", "GET, OPTIONS")
         self.send_header("Access-Control-Allow-Headers", "*")
@@ -12,7 +315,170 @@ class CORSHTTPRequestHandler(SimpleHTTPRequestHandler):
 
     def do_OPTIONS(self):
         self.send_response(200, "OK")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        if self.live_reload is not None and urllib.parse.urlsplit(self.path).path == LIVE_RELOAD_PATH:
+            self.send_live_reload_events()
+        else:
+            super().do_GET()
+
+    def send_live_reload_events(self):
+        # The stream has no length, so the connection cannot be reused afterwards.
+        self.close_connection = True
+        # Taken before the headers go out, so a rebuild the client sees them for is not missed.
+        generation = self.live_reload.generation
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        try:
+            while True:
+                current = self.live_reload.wait(generation, timeout=15)
+                if self.live_reload.closed:
+                    return
+                if current != generation:
+                    self.wfile.write(b"data: reload\n\n")
+                    generation = current
+                else:
+                    self.wfile.write(b": keep-alive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def send_head(self):
+        if self.file_cache is not None and self.live_reload is None:
+            return self.send_cached_head()
+        self.immutable = self.is_immutable()
+        return self.send_file_head()
+
+    def send_error(self, code, message=None, explain=None):
+        self.immutable = False
+        super().send_error(code, message, explain)
+
+    def is_immutable(self):
+        # A fingerprinted name changes whenever the content does, so it never needs revalidating.
+        if self.fingerprints is None:
+            return False
+        return urllib.parse.unquote(urllib.parse.urlsplit(self.path).path) in self.fingerprints
+
+    def send_cached_head(self):
+        key = (urllib.parse.urlsplit(self.path).path, accepts_gzip(self.headers.get("Accept-Encoding", "")))
+        entry = self.file_cache.get(key)
+        if entry is None:
+            entry = self.load_cache_entry(key[1])
+            if entry is None:
+                return self.send_file_head()
+            self.file_cache.put(key, entry)
+
+        self.vary_encoding = entry.vary
+        self.immutable = entry.immutable
+        if self.headers.get("If-Modified-Since") == entry.last_modified:
+            self.send_response(304)
+            self.end_headers()
+            return None
+
+        self.send_response(200)
+        self.send_header("Content-Type", entry.content_type)
+        if entry.encoding is not None:
+            self.send_header("Content-Encoding", entry.encoding)
+        self.send_header("Content-Length", str(len(entry.data)))
+        self.send_header("Last-Modified", entry.last_modified)
+        self.end_headers()
+        return BytesIO(entry.data)
+
+    def load_cache_entry(self, gzip_ok):
+        # Returns None for anything the cache does not hold: listings, missing and large files.
+        path = self.file_path()
+        if path is None:
+            return None
+
+        vary = is_precompressed(path)
+        data_path, encoding = path, None
+        if vary and gzip_ok:
+            data_path, encoding = path + ".gz", "gzip"
+        with open(data_path, "rb") as file:
+            stat = os.fstat(file.fileno())
+            if stat.st_size > self.file_cache.max_file_size:
+                return None
+            data = file.read()
+
+        mtimes = {path: os.stat(path).st_mtime_ns, data_path: stat.st_mtime_ns}
+        last_modified = self.date_time_string(stat.st_mtime)
+        return CacheEntry(data, self.guess_type(path), encoding, vary, last_modified, self.is_immutable(), mtimes)
+
+    def copyfile(self, source, outputfile):
+        if isinstance(source, BytesIO):
+            outputfile.write(source.getbuffer())
+        else:
+            # Let the kernel copy file bodies straight to the socket.
+            self.connection.sendfile(source)
+
+    def send_file_head(self):
+        path = self.file_path()
+        if self.live_reload is not None and path is not None and path.endswith(".html"):
+            return self.send_live_reload_html(path)
+        if path is not None and is_precompressed(path):
+            # Caches must key on Accept-Encoding whichever variant is sent.
+            self.vary_encoding = True
+            if accepts_gzip(self.headers.get("Accept-Encoding", "")):
+                return self.send_precompressed(path)
+        return super().send_head()
+
+    def file_path(self):
+        # The file a GET would serve, or None if it is a directory listing or missing.
+        url_path = urllib.parse.urlsplit(self.path).path
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and url_path.endswith("/"):
+            path = os.path.join(path, "index.html")
+        if not os.path.isfile(path):
+            return None
+        return path
+
+    def send_precompressed(self, path):
+        file = open(path + ".gz", "rb")
+        stat = os.fstat(file.fileno())
+        self.send_response(200)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(stat.st_size))
+        self.send_header("Last-Modified", self.date_time_string(stat.st_mtime))
         self.end_headers()
+        return file
+
+    def send_live_reload_html(self, path):
+        with open(path, "rb") as file:
+            html = file.read()
+        if b"</body>" in html:
+            html = html.replace(b"</body>", LIVE_RELOAD_SCRIPT + b"</body>", 1)
+        else:
+            html += LIVE_RELOAD_SCRIPT
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(html)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        return BytesIO(html)
+
+
+def accepts_gzip(accept_encoding):
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            params = params.replace(" ", "")
+            return params not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def is_precompressed(path):
+    # A .gz sibling is only used while it carries its source's mtime, so stale copies are ignored.
+    try:
+        return os.stat(path + ".gz").st_mtime_ns == os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return False
 
 
 def run(
@@ -20,13 +486,49 @@ def run(
     handler_class=CORSHTTPRequestHandler,
     port=8000,
     directory=None,
+    workers=1,
+    file_cache=None,
+    fingerprints=None,
+    live_reload=None,
 ):
-    if directory:  # Change the current working directory if directory is specified
-        os.chdir(directory)
+    if file_cache is not None:
+        handler_class = type(handler_class.__name__, (handler_class,), {"file_cache": file_cache})
+    if fingerprints is not None:
+        handler_class = type(handler_class.__name__, (handler_class,), {"fingerprints": fingerprints})
+    if live_reload is not None:
+        handler_class = type(handler_class.__name__, (handler_class,), {"live_reload": live_reload})
+    if directory:  # Serve from the directory without changing the working directory
+        handler_class = partial(handler_class, directory=directory)
     server_address = ("", port)
-    httpd = server_class(server_address, handler_class)
-    print(f"Serving HTTP on http://localhost:{port} from directory '{directory}'...")
-    httpd.serve_forever()
+    if workers > 1:
+        httpd = ThreadPoolHTTPServer(server_address, handler_class, workers, live_reload)
+    else:
+        httpd = server_class(server_address, handler_class)
+    print(f"Serving HTTP on http://localhost:{port} from directory '{directory}' with {workers} worker(s)...")
+    try:
+        httpd.serve_forever()
+    finally:
+        httpd.server_close()
+
+
+def watch_and_run(port, directory, workers, interval, build_argv=()):
+    # build_argv holds main.py's flags, so watch builds match the site's normal builds.
+    # The build modules live in src/, next to this script.
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+    from main import Site, parse_args
+    from watch import watch
+
+    live_reload = LiveReload()
+    site = Site(os.getcwd())
+    watcher = threading.Thread(
+        target=watch, args=(parse_args(list(build_argv)), site, live_reload.notify, interval), daemon=True
+    )
+    watcher.start()
+    # Each open live reload stream holds a worker, so keep a few spare for page requests.
+    run(
+        port=port, directory=directory, workers=max(workers, 8), fingerprints=FingerprintMap(site.manifest_path),
+        live_reload=live_reload,
+    )
 
 
 if __name__ == "__main__":
@@ -35,6 +537,39 @@ if __name__ == "__main__":
         "--dir", type=str, help="Directory to serve files from", default="."
     )
     parser.add_argument("--port", type=int, help="Port to serve HTTP on", default=8888)
+    parser.add_argument(
+        "--workers", type=int, help="Number of worker threads handling requests concurrently", default=16
+    )
+    parser.add_argument(
+        "--cache-size", type=int, help="Size in MB of the in-memory file cache; 0 disables it", default=0
+    )
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        help="Build manifest listing the fingerprinted assets to serve as immutable",
+        default=".build_manifest.json",
+    )
+    parser.add_argument(
+        "--watch", action="store_true", help="Rebuild the site on changes and reload connected browsers"
+    )
+    parser.add_argument(
+        "--poll-interval", type=float, help="Seconds between checks for changes in watch mode", default=0.05
+    )
+    parser.add_argument(
+        "--build-args",
+        type=str,
+        help='Build flags for watch mode, as passed to main.py, e.g. "--fingerprint --minify"',
+        default="",
+    )
     args = parser.parse_args()
 
-    run(port=args.port, directory=args.dir)
+    if args.watch:
+        watch_and_run(args.port, args.dir, args.workers, args.poll_interval, shlex.split(args.build_args))
+    else:
+        file_cache = None
+        if args.cache_size > 0:
+            file_cache = FileCache(max_bytes=args.cache_size * 1024 * 1024)
+        run(
+            port=args.port, directory=args.dir, workers=args.workers, file_cache=file_cache,
+            fingerprints=FingerprintMap(args.manifest),
+        )
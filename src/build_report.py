@@ -0,0 +1,62 @@
+import json
+
+
+TIME_FIELDS = ("parse_time", "render_time", "write_time")
+SIZE_FIELDS = ("source_bytes", "output_bytes", "blocks", "cached_blocks", "nodes")
+# Page data kept for the manifest rather than the report.
+UNREPORTED_FIELDS = ("output_hash", "links", "assets", "search")
+
+
+class BuildReport:
+    def __init__(self):
+        self.pages = []
+        self.skipped = 0
+
+    def add(self, stats):
+        page = {key: value for key, value in stats.items() if key not in UNREPORTED_FIELDS}
+        page["total_time"] = sum(page[field] for field in TIME_FIELDS)
+        self.pages.append(page)
+
+    def totals(self):
+        totals = {"pages": len(self.pages), "skipped": self.skipped}
+        for field in SIZE_FIELDS + TIME_FIELDS + ("total_time",):
+            totals[field] = sum(page[field] for page in self.pages)
+        return totals
+
+    def slowest(self, top=10):
+        return sorted(self.pages, key=lambda page: page["total_time"], reverse=True)[:top]
+
+    def largest(self, top=10):
+        return sorted(self.pages, key=lambda page: page["source_bytes"], reverse=True)[:top]
+
+    def to_dict(self, top=10):
+        return {
+            "totals": self.totals(),
+            "slowest": self.slowest(top),
+            "largest": self.largest(top),
+            "pages": self.pages,
+        }
+
+    def write(self, path, top=10):
+        with open(path, "w") as file:
+            json.dump(self.to_dict(top), file, indent=1)
+
+    def summary(self, top=10):
+        totals = self.totals()
+        lines = [
+            f"Built {totals['pages']} pages ({totals['skipped']} unchanged) from {totals['source_bytes']} bytes "
+            f"of markdown into {totals['output_bytes']} bytes of HTML",
+            f"Time: parse {totals['parse_time']:.3f}s, render {totals['render_time']:.3f}s, "
+            f"write {totals['write_time']:.3f}s",
+        ]
+        if totals["cached_blocks"]:
+            # Cached blocks skip parsing, so parse times are only comparable at similar hit rates.
+            lines.append(f"Blocks: {totals['blocks']} ({totals['cached_blocks']} from the fragment cache)")
+        if self.pages:
+            lines.append(f"Slowest {min(top, len(self.pages))} pages:")
+            for page in self.slowest(top):
+                lines.append(f"  {page['total_time'] * 1000:9.2f} ms  {page['nodes']:7d} nodes  {page['source']}")
+            lines.append(f"Largest {min(top, len(self.pages))} pages:")
+            for page in self.largest(top):
+                lines.append(f"  {page['source_bytes']:9d} B  {page['blocks']:7d} blocks  {page['source']}")
+        return "\n".join(lines)
@@ -0,0 +1,75 @@
+import gzip
+import os
+
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".json", ".svg", ".txt", ".xml")
+
+
+def precompress_directory(path, manifest, level=9, extensions=COMPRESSIBLE_EXTENSIONS):
+    # Writes a .gz sibling next to each text file that gets smaller when compressed. Only .gz
+    # files this stage wrote, as recorded in manifest.compressed, are ever replaced or removed.
+    if not os.path.exists(path):
+        raise Exception("Directory to compress does not exist")
+
+    owned = set(manifest.compressed)
+    # A .gz file copied from static/ is content, not a copy this stage made.
+    assets = set(manifest.assets)
+    compressed = set()
+    written = 0
+    for dir_path, _, file_names in os.walk(path):
+        for name in sorted(file_names):
+            if name.endswith(".gz") or not name.endswith(extensions):
+                continue
+            file_path = os.path.join(dir_path, name)
+            gz_key = os.path.relpath(file_path + ".gz")
+            if gz_key in assets:
+                continue
+            if compress_file(file_path, level):
+                written += 1
+            if os.path.exists(file_path + ".gz"):
+                compressed.add(gz_key)
+
+    for gz_key in owned - compressed:
+        if gz_key not in assets and os.path.exists(gz_key):
+            os.remove(gz_key)
+    manifest.compressed = sorted(compressed)
+    return written
+
+
+def remove_compressed(manifest):
+    # Deletes the .gz copies earlier --precompress builds wrote, for builds without it.
+    assets = set(manifest.assets)
+    for gz_key in manifest.compressed:
+        if gz_key not in assets and os.path.exists(gz_key):
+            os.remove(gz_key)
+    manifest.compressed = []
+
+
+def compress_file(path, level=9):
+    gz_path = path + ".gz"
+    stat = os.stat(path)
+    if is_current(path, gz_path):
+        return False
+
+    with open(path, "rb") as file:
+        data = file.read()
+    compressed = gzip.compress(data, compresslevel=level, mtime=0)
+    if len(compressed) >= len(data):
+        if os.path.exists(gz_path):
+            os.remove(gz_path)
+        return False
+
+    tmp_path = gz_path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(compressed)
+    # The .gz copy carries its source's mtime, which is how staleness is detected.
+    os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(tmp_path, gz_path)
+    return True
+
+
+def is_current(path, gz_path):
+    try:
+        return os.stat(gz_path).st_mtime_ns == os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return False
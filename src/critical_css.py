@@ -0,0 +1,147 @@
+import hashlib
+import os
+import re
+
+from links import link_target
+from templates import load_template
+
+
+# Every tag the markdown renderer can emit; templates add their own.
+RENDERER_TAGS = {
+    "div", "p", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "ul", "ol", "li", "pre", "code",
+    "b", "i", "a", "img",
+}
+
+_COMMENT_PATTERN = re.compile(r"/\*.*?\*/", re.DOTALL)
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_COMBINATOR_PATTERN = re.compile(r"\s*[>+~]\s*|\s+")
+_TYPE_SELECTOR_PATTERN = re.compile(r"\*|[a-zA-Z][a-zA-Z0-9-]*")
+_TEMPLATE_TAG_PATTERN = re.compile(r"<([a-zA-Z][a-zA-Z0-9-]*)")
+_LINK_TAG_PATTERN = re.compile(r"<link\b[^>]*>")
+_LINK_ATTRIBUTE_PATTERN = re.compile(r"""\b(rel|href)=(?:"([^"]*)"|'([^']*)'|([^\s>]+))""")
+# Rules inside these at-rules can apply at first paint; anything else (@font-face, @keyframes)
+# is left to the full stylesheet.
+_GROUPING_AT_RULES = ("@media", "@supports")
+
+
+def template_tags(template_paths):
+    tags = set()
+    for path in template_paths:
+        for literal in load_template(path).segments[::2]:
+            tags.update(tag.lower() for tag in _TEMPLATE_TAG_PATTERN.findall(literal))
+    return tags
+
+
+def critical_css(stylesheet, tags):
+    # The rules of stylesheet whose selectors only name tags in tags, minified. Selectors with
+    # classes, ids, attributes or pseudo-classes are left to the full stylesheet.
+    return "".join(_critical_rules(_COMMENT_PATTERN.sub("", stylesheet), tags))
+
+
+def _critical_rules(css, tags):
+    position = 0
+    while True:
+        brace = css.find("{", position)
+        if brace == -1:
+            return
+        prelude = css[position:brace].strip()
+        if prelude.startswith("@") and ";" in prelude:
+            # Statement at-rules such as @import and @charset end before the next block.
+            position = css.find(";", position) + 1
+            continue
+        end = _matching_brace(css, brace)
+        body = css[brace + 1:end]
+        position = end + 1
+
+        if prelude.startswith("@"):
+            if prelude.startswith(_GROUPING_AT_RULES):
+                inner = "".join(_critical_rules(body, tags))
+                if inner:
+                    yield f"{_WHITESPACE_PATTERN.sub(' ', prelude)}{{{inner}}}"
+            continue
+
+        selectors = [_WHITESPACE_PATTERN.sub(" ", selector.strip()) for selector in prelude.split(",")]
+        selectors = [selector for selector in selectors if _is_critical(selector, tags)]
+        declarations = [_declaration(declaration) for declaration in body.split(";") if declaration.strip()]
+        if selectors and declarations:
+            yield f"{','.join(selectors)}{{{';'.join(declarations)}}}"
+
+
+def _declaration(declaration):
+    name, _, value = declaration.partition(":")
+    return f"{name.strip()}:{_WHITESPACE_PATTERN.sub(' ', value.strip())}"
+
+
+def _matching_brace(css, start):
+    depth = 0
+    for index in range(start, len(css)):
+        if css[index] == "{":
+            depth += 1
+        elif css[index] == "}":
+            depth -= 1
+            if depth == 0:
+                return index
+    raise Exception("Unbalanced braces in stylesheet")
+
+
+def _is_critical(selector, tags):
+    parts = [part for part in _COMBINATOR_PATTERN.split(selector) if part]
+    return all(
+        _TYPE_SELECTOR_PATTERN.fullmatch(part) and (part == "*" or part.lower() in tags) for part in parts
+    )
+
+
+def critical_css_filter(static_path, public_path, manifest, template_paths):
+    # Works out the critical rules of every synced stylesheet, reusing the analysis of any
+    # stylesheet and tag set seen before. Returns a CriticalCSS filter.
+    tags = RENDERER_TAGS | template_tags(template_paths)
+    tags_key = hashlib.sha256(" ".join(sorted(tags)).encode()).hexdigest()[:16]
+    styles = {}
+    sources = {}
+    for asset_path in manifest.assets:
+        relative_path = os.path.relpath(asset_path, public_path)
+        if not relative_path.endswith(".css"):
+            continue
+        source_path = os.path.join(static_path, relative_path)
+        key = f"{manifest.hash_of(source_path)}:{tags_key}"
+        if key not in manifest.critical_css:
+            with open(source_path, "r") as file:
+                manifest.critical_css[key] = critical_css(file.read(), tags)
+        site_path = relative_path.replace(os.sep, "/")
+        styles[site_path] = manifest.critical_css[key]
+        sources[site_path] = source_path
+    return CriticalCSS(public_path, styles, sources)
+
+
+class CriticalCSS:
+    # Page filter that inlines the critical rules of local stylesheets and loads the full
+    # stylesheet without blocking rendering.
+    def __init__(self, public_path, styles, sources):
+        self.public_path = public_path
+        self.styles = styles
+        self.sources = sources
+
+    def __call__(self, chunks, dest_path, dependencies):
+        page_path = os.path.relpath(dest_path, self.public_path).replace(os.sep, "/")
+
+        def replace(match):
+            attributes = {}
+            for name, *values in _LINK_ATTRIBUTE_PATTERN.findall(match.group()):
+                attributes[name] = "".join(values)
+            if attributes.get("rel", "").lower() != "stylesheet" or "href" not in attributes:
+                return match.group()
+            target = link_target(attributes["href"], page_path)
+            if target not in self.styles:
+                return match.group()
+            dependencies.add(self.sources[target])
+            href = attributes["href"]
+            return (
+                f"<style>{self.styles[target]}</style>"
+                f'<link rel="preload" href="{href}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+                f'<noscript><link rel="stylesheet" href="{href}"></noscript>'
+            )
+
+        for chunk in chunks:
+            if "<link" in chunk:
+                chunk = _LINK_TAG_PATTERN.sub(replace, chunk)
+            yield chunk
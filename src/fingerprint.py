@@ -0,0 +1,80 @@
+import os
+import posixpath
+import re
+import shutil
+from urllib.parse import urlsplit, urlunsplit
+
+from links import link_target
+
+
+FINGERPRINT_LENGTH = 8
+# Pages are linked to by name from outside the site, so they keep their names.
+UNFINGERPRINTED_EXTENSIONS = (".html",)
+
+_URL_ATTRIBUTE_PATTERN = re.compile(r'\b(href|src)="([^"]*)"')
+
+
+def fingerprinted_name(path, digest):
+    root, extension = posixpath.splitext(path)
+    return f"{root}.{digest[:FINGERPRINT_LENGTH]}{extension}"
+
+
+def fingerprint_assets(static_path, public_path, manifest):
+    # Copies each synced static asset to a name containing its content hash. The plain copy
+    # stays for links from outside the site. Returns an AssetRewriter for the new names.
+    assets = {}
+    sources = {}
+    for asset_path in manifest.assets:
+        relative_path = os.path.relpath(asset_path, public_path)
+        if relative_path.endswith(UNFINGERPRINTED_EXTENSIONS):
+            continue
+        site_path = relative_path.replace(os.sep, "/")
+        source_path = os.path.join(static_path, relative_path)
+        fingerprinted = fingerprinted_name(site_path, manifest.hash_of(source_path))
+        fingerprinted_path = os.path.join(os.path.dirname(asset_path), posixpath.basename(fingerprinted))
+        if not os.path.exists(fingerprinted_path):
+            shutil.copy2(asset_path, fingerprinted_path)
+            print(f"Fingerprinted {asset_path} as {fingerprinted_path}")
+        assets[site_path] = fingerprinted
+        sources[site_path] = source_path
+
+    remove_stale_fingerprints(public_path, manifest, assets)
+    return AssetRewriter(public_path, assets, sources)
+
+
+def remove_stale_fingerprints(public_path, manifest, assets=None):
+    # Deletes fingerprinted copies from earlier builds that are not in assets.
+    assets = assets or {}
+    for site_path, fingerprinted in sorted(manifest.fingerprints.items()):
+        if assets.get(site_path) != fingerprinted:
+            stale_path = os.path.join(public_path, *fingerprinted.split("/"))
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+                print(f"Removed stale asset {stale_path}")
+    manifest.fingerprints = assets
+
+
+class AssetRewriter:
+    # Page filter that points href and src attributes at fingerprinted asset names.
+    def __init__(self, public_path, assets, sources):
+        self.public_path = public_path
+        self.assets = assets
+        self.sources = sources
+
+    def __call__(self, chunks, dest_path, dependencies):
+        page_path = os.path.relpath(dest_path, self.public_path).replace(os.sep, "/")
+
+        def replace(match):
+            url = match.group(2)
+            target = link_target(url, page_path)
+            fingerprinted = self.assets.get(target)
+            if fingerprinted is None:
+                return match.group()
+            dependencies.add(self.sources[target])
+            parts = urlsplit(url)
+            return f'{match.group(1)}="{urlunsplit(("", "", "/" + fingerprinted, parts.query, parts.fragment))}"'
+
+        # Attributes are never split across chunks: tags and template text arrive whole.
+        for chunk in chunks:
+            yield _URL_ATTRIBUTE_PATTERN.sub(replace, chunk)
+
@@ -0,0 +1,110 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+
+RENDERER_MODULES = ("markdown_blocks.py", "inline_markdown.py", "textnode.py", "htmlnode.py")
+# Bumped whenever the fragments table changes shape; older tables are dropped.
+SCHEMA_VERSION = 2
+
+
+def renderer_version():
+    # Any change to the renderer's source invalidates every cached fragment.
+    hasher = hashlib.sha256()
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in RENDERER_MODULES:
+        with open(os.path.join(source_dir, name), "rb") as file:
+            hasher.update(file.read())
+    return hasher.hexdigest()[:16]
+
+
+class FragmentCache:
+    def __init__(self, path, max_bytes=64 * 1024 * 1024, min_block_size=128):
+        self.path = path
+        self.max_bytes = max_bytes
+        # Parsing a short block is cheaper than looking it up.
+        self.min_block_size = min_block_size
+        self.version = renderer_version()
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+        self._used = {}
+
+    def __getstate__(self):
+        # Worker processes open their own connection.
+        state = self.__dict__.copy()
+        state["_connection"] = None
+        state["_used"] = {}
+        return state
+
+    def get(self, block):
+        # Returns (html, node count) for a cached block, or None.
+        key = self._key(block)
+        row = self._connect().execute("SELECT html, nodes FROM fragments WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._used[key] = time.time()
+        return row
+
+    def put(self, block, html, nodes):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO fragments (key, html, nodes, size, used) VALUES (?, ?, ?, ?, ?)",
+            (self._key(block), html, nodes, len(html), time.time()),
+        )
+
+    def flush(self):
+        if self._connection is None:
+            return
+        if self._used:
+            self._connection.executemany(
+                "UPDATE fragments SET used = ? WHERE key = ?",
+                [(used, key) for key, used in self._used.items()],
+            )
+            self._used = {}
+        self._connection.commit()
+
+    def trim(self):
+        # Evict least recently used fragments until the cache fits in max_bytes.
+        connection = self._connect()
+        self.flush()
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM fragments").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+
+        evicted = []
+        for key, size in connection.execute("SELECT key, size FROM fragments ORDER BY used"):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        connection.executemany("DELETE FROM fragments WHERE key = ?", evicted)
+        connection.commit()
+        return len(evicted)
+
+    def close(self):
+        self.flush()
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _key(self, block):
+        return hashlib.sha256(f"{self.version}\0{block}".encode()).hexdigest()
+
+    def _connect(self):
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=60)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            if self._connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                self._connection.execute("DROP TABLE IF EXISTS fragments")
+                self._connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS fragments (key TEXT PRIMARY KEY, html TEXT NOT NULL, "
+                "nodes INTEGER NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)"
+            )
+        return self._connection
@@ -1,6 +1,12 @@
+import sys
+
+
 class HTMLNode:
+    # Slots instead of a per-instance __dict__ keep large page trees small.
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag = None, value = None, children = None, props = None):
-        self.tag = tag
+        self.tag = sys.intern(tag) if tag is not None else None
         self.value = value
         self.children = children
         self.props = props
@@ -8,6 +14,12 @@ class HTMLNode:
     def to_html(self):
         raise NotImplementedError()
 
+    def iter_html(self):
+        raise NotImplementedError()
+
+    def render_to(self, writer):
+        writer.writelines(self.iter_html())
+
     def props_to_html(self):
         html = ""
         if self.props is not None:
@@ -20,6 +32,8 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props = None):
         super().__init__(tag, value, None, props)
 
@@ -32,19 +46,41 @@ class LeafNode(HTMLNode):
 
         return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
 
+    def iter_html(self):
+        yield self.to_html()
+
+class FragmentNode(LeafNode):
+    # HTML rendered earlier, standing in for the node_count nodes it was rendered from.
+    __slots__ = ("node_count",)
+
+    def __init__(self, html, node_count):
+        super().__init__(None, html)
+        self.node_count = node_count
+
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props = None):
         super().__init__(tag, None, children, props)
 
     def to_html(self):
+        return "".join(self.iter_html())
+
+    def iter_html(self):
         if self.tag is None:
             raise ValueError("Parent nodes require a tag.")
         elif self.children is None:
             raise ValueError("Parent nodes require children.")
 
-        html = f"<{self.tag}{self.props_to_html()}>"
+        yield f"<{self.tag}{self.props_to_html()}>"
         for node in self.children:
-            html += node.to_html()
-        html += f"</{self.tag}>"
+            yield from node.iter_html()
+        yield f"</{self.tag}>"
 
-        return html
+def count_nodes(node):
+    if isinstance(node, FragmentNode):
+        return node.node_count
+    count = 1
+    for child in node.children or ():
+        count += count_nodes(child)
+    return count
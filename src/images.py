@@ -0,0 +1,133 @@
+import os
+import re
+import struct
+
+from links import link_target
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+
+_IMG_TAG_PATTERN = re.compile(r"<img\b([^>]*)>")
+_SRC_PATTERN = re.compile(r'\bsrc="([^"]*)"')
+_SIZE_PATTERN = re.compile(r"\b(?:width|height)=")
+# JPEG start-of-frame markers; C4, C8 and CC share the range but mean something else.
+_JPEG_FRAME_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def image_size(path):
+    # Returns (width, height) read from the file header, or None if the format is not known
+    # or the header is cut short.
+    try:
+        return _header_size(path)
+    except struct.error:
+        return None
+
+
+def _header_size(path):
+    with open(path, "rb") as file:
+        header = file.read(32)
+        if header.startswith(b"\x89PNG\r\n\x1a\n") and header[12:16] == b"IHDR":
+            return struct.unpack(">II", header[16:24])
+        if header[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", header[6:10])
+        if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+            return _webp_size(header)
+        if header[:2] == b"\xff\xd8":
+            file.seek(2)
+            return _jpeg_size(file)
+    return None
+
+
+def _webp_size(header):
+    chunk = header[12:16]
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        bits = struct.unpack("<I", header[21:25])[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        if len(header) < 30:
+            return None
+        width = int.from_bytes(header[24:27], "little") + 1
+        height = int.from_bytes(header[27:30], "little") + 1
+        return width, height
+    return None
+
+
+def _jpeg_size(file):
+    # Walks the marker segments until the frame header, skipping metadata such as EXIF.
+    while True:
+        byte = file.read(1)
+        if byte != b"\xff":
+            return None
+        marker = file.read(1)
+        while marker == b"\xff":
+            marker = file.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        if code == 0x01 or 0xD0 <= code <= 0xD8:
+            continue
+        length_bytes = file.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack(">H", length_bytes)[0]
+        if code in _JPEG_FRAME_MARKERS:
+            frame = file.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">xHH", frame)
+            return width, height
+        file.seek(length - 2, os.SEEK_CUR)
+
+
+def image_attributes(static_path, public_path, manifest):
+    # Measures every synced image, reading only those whose content hash is new.
+    # Returns an ImageAttributes filter for the measured images.
+    sizes = {}
+    sources = {}
+    for asset_path in manifest.assets:
+        relative_path = os.path.relpath(asset_path, public_path)
+        if not relative_path.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        source_path = os.path.join(static_path, relative_path)
+        digest = manifest.hash_of(source_path)
+        if digest not in manifest.image_sizes:
+            manifest.image_sizes[digest] = image_size(source_path)
+        if manifest.image_sizes[digest] is not None:
+            site_path = relative_path.replace(os.sep, "/")
+            sizes[site_path] = tuple(manifest.image_sizes[digest])
+            sources[site_path] = source_path
+    return ImageAttributes(public_path, sizes, sources)
+
+
+class ImageAttributes:
+    # Page filter that gives local images their size and lets browsers load them lazily,
+    # so the page does not reflow as they arrive.
+    def __init__(self, public_path, sizes, sources):
+        self.public_path = public_path
+        self.sizes = sizes
+        self.sources = sources
+
+    def __call__(self, chunks, dest_path, dependencies):
+        page_path = os.path.relpath(dest_path, self.public_path).replace(os.sep, "/")
+
+        def replace(match):
+            attributes = match.group(1)
+            src = _SRC_PATTERN.search(attributes)
+            if src is None or _SIZE_PATTERN.search(attributes):
+                return match.group()
+            target = link_target(src.group(1), page_path)
+            size = self.sizes.get(target)
+            if size is None:
+                return match.group()
+            dependencies.add(self.sources[target])
+            return (
+                f'<img{attributes} width="{size[0]}" height="{size[1]}" loading="lazy" decoding="async">'
+            )
+
+        for chunk in chunks:
+            if "<img" in chunk:
+                chunk = _IMG_TAG_PATTERN.sub(replace, chunk)
+            yield chunk
@@ -4,13 +4,60 @@ from textnode import TextNode, TextType
 from htmlnode import LeafNode
 
 
+_INLINE_PATTERN = re.compile(r"\*\*|[*`]|!\[|\[")
+# Like the extract_markdown_* patterns, but a link never spans a delimiter or another "[".
+# Each pattern stops at the "(" before the URL; see _URL_END_PATTERN.
+_IMAGE_PATTERN = re.compile(r"!\[([^*`\n[]*?)\]\(")
+_LINK_PATTERN = re.compile(r"\[([^*`\n[]*?)\]\(")
+# The ")" closing a URL, or the first character a URL cannot contain.
+_URL_END_PATTERN = re.compile(r"[)*`\n]")
+_DELIMITER_TYPES = {"**": TextType.BOLD, "*": TextType.ITALIC, "`": TextType.CODE}
+
+
 def text_to_textnodes(text):
-    nodes = [TextNode(text, TextType.TEXT)]
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_link(nodes)
-    nodes = split_nodes_image(nodes)
+    # Single left-to-right scan; delimited spans are taken verbatim, like the split_nodes_* passes.
+    nodes = []
+    text_start = 0
+    position = 0
+    while True:
+        match = _INLINE_PATTERN.search(text, position)
+        if match is None:
+            break
+
+        token = match.group()
+        if token in _DELIMITER_TYPES:
+            end = text.find(token, match.end())
+            if end == -1:
+                raise Exception("Invalid Markdown syntax.")
+            if match.start() > text_start:
+                nodes.append(TextNode(text[text_start:match.start()], TextType.TEXT))
+            if end > match.end():
+                nodes.append(TextNode(text[match.end():end], _DELIMITER_TYPES[token]))
+            text_start = position = end + len(token)
+            continue
+
+        if token == "![":
+            pattern, text_type = _IMAGE_PATTERN, TextType.IMAGE
+        else:
+            pattern, text_type = _LINK_PATTERN, TextType.LINK
+        # Failed attempts must not rescan text, or unclosed brackets make the scan quadratic.
+        # Link text stops at the next "[", and a URL without its ")" means no link can close
+        # before that URL's end, so the search resumes there.
+        text_match = pattern.match(text, match.start())
+        if text_match is None:
+            position = match.end()
+            continue
+        url_end = _URL_END_PATTERN.search(text, text_match.end())
+        if url_end is None or url_end.group() != ")":
+            position = len(text) if url_end is None else url_end.start()
+            continue
+        if match.start() > text_start:
+            nodes.append(TextNode(text[text_start:match.start()], TextType.TEXT))
+        nodes.append(TextNode(text_match.group(1), text_type, text[text_match.end():url_end.start()]))
+        text_start = position = url_end.end()
+
+    if len(text) > text_start:
+        nodes.append(TextNode(text[text_start:], TextType.TEXT))
     return nodes
 
 
@@ -0,0 +1,90 @@
+import json
+import os
+import posixpath
+import re
+from urllib.parse import unquote, urlsplit
+
+from markdown_blocks import BlockType
+
+
+# Same shape as the inline link and image patterns; only the URL is captured.
+_URL_PATTERN = re.compile(r"!?\[[^*`\n[]*?\]\(([^*`\n]*?)\)")
+_CODE_SPAN_PATTERN = re.compile(r"`[^`\n]*`")
+
+
+def block_links(block, block_type):
+    # URLs of the links and images in a block, skipping code.
+    if block_type == BlockType.CODE or "](" not in block:
+        return []
+    return _URL_PATTERN.findall(_CODE_SPAN_PATTERN.sub("", block))
+
+
+def link_target(url, page_path):
+    # Resolves an internal URL to a path relative to the site root, or returns None for
+    # external URLs and same-page anchors. page_path is the page's output path, also
+    # relative to the site root.
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    path = unquote(parts.path)
+    if path.startswith("/"):
+        target = path.lstrip("/")
+    else:
+        target = posixpath.join(posixpath.dirname(page_path), path)
+    return posixpath.normpath(target)
+
+
+def site_files(public_path):
+    files = set()
+    for dir_path, _, file_names in os.walk(public_path):
+        relative_dir = os.path.relpath(dir_path, public_path).replace(os.sep, "/")
+        for file_name in file_names:
+            files.add(posixpath.normpath(posixpath.join(relative_dir, file_name)))
+    return files
+
+
+class LinkIndex:
+    def __init__(self):
+        # Target path -> [(source, url)] for every internal link and image.
+        self.references = {}
+
+    @classmethod
+    def from_manifest(cls, manifest, public_path):
+        index = cls()
+        page_index = manifest.page_index()
+        for source, entry in sorted(manifest.pages.items()):
+            page_path = os.path.relpath(entry["output_path"], public_path).replace(os.sep, "/")
+            for url in page_index.get(source, {}).get("links", ()):
+                index.add(source, page_path, url)
+        return index
+
+    def add(self, source, page_path, url):
+        target = link_target(url, page_path)
+        if target is not None:
+            self.references.setdefault(target, []).append((source, url))
+
+    def broken(self, files):
+        # One set lookup per target, so checking is linear in the number of links.
+        broken = []
+        for target, references in self.references.items():
+            index_page = posixpath.normpath(posixpath.join(target, "index.html"))
+            if target not in files and index_page not in files:
+                broken.extend(references)
+        return sorted(broken)
+
+    def write(self, path, files):
+        data = {
+            "targets": {target: [source for source, _ in refs] for target, refs in sorted(self.references.items())},
+            "broken": [{"source": source, "url": url} for source, url in self.broken(files)],
+        }
+        with open(path, "w") as file:
+            json.dump(data, file, indent=1)
+
+
+def check_links(manifest, public_path, report_path=None):
+    # Returns the (source, url) pairs whose target is neither a page nor a static file.
+    index = LinkIndex.from_manifest(manifest, public_path)
+    files = site_files(public_path)
+    if report_path is not None:
+        index.write(report_path, files)
+    return index.broken(files)
@@ -1,17 +1,275 @@
+import argparse
+import cProfile
 import os
+import shutil
 
-from utilites import copy_directory
+import profiling
+from build_report import BuildReport
+from compression import precompress_directory, remove_compressed
+from critical_css import critical_css_filter
+from fingerprint import fingerprint_assets, remove_stale_fingerprints
+from fragment_cache import FragmentCache
+from images import image_attributes
+from links import check_links
+from manifest import Manifest
+from minify import minify_html
+from utilites import sync_directory
 from page_generation import generate_pages_recursive
+from search_index import remove_search_index, write_search_index
+from shards import merge_shards, parse_shard
+from templates import find_layouts
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Static site generator")
+    parser.add_argument(
+        "--force", action="store_true", help="Regenerate every page, ignoring the build manifest"
+    )
+    parser.add_argument(
+        "--explain", action="store_true", help="Print why each regenerated page had to be rebuilt"
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=1, help="Number of worker processes used to render pages"
+    )
+    parser.add_argument(
+        "--pipeline", action="store_true",
+        help="Overlap file reads and writes on a thread pool with parsing and rendering, in one process",
+    )
+    parser.add_argument(
+        "--io-threads", type=int, default=8, help="Threads used for reads and writes in --pipeline mode"
+    )
+    parser.add_argument(
+        "--queue-depth", type=int, default=32, help="Maximum reads and writes in flight in --pipeline mode"
+    )
+    parser.add_argument(
+        "--shard", metavar="I/N",
+        help="Build only the I-th of N slices of the pages, split by source path hash, into shards/I-of-N/",
+    )
+    parser.add_argument(
+        "--merge", nargs="+", metavar="SHARD_DIR",
+        help="Combine the output and manifests of shard builds into public/ instead of building",
+    )
+    parser.add_argument(
+        "--clean", action="store_true", help="Delete public/ and copy every static file again"
+    )
+    parser.add_argument(
+        "--hash-assets", action="store_true", help="Compare static files by content hash instead of size and mtime"
+    )
+    parser.add_argument(
+        "--fingerprint", action="store_true",
+        help="Copy static assets to content-hashed names and point pages at them",
+    )
+    parser.add_argument(
+        "--no-image-sizes", action="store_true",
+        help="Do not add width, height and lazy-loading attributes to local images",
+    )
+    parser.add_argument(
+        "--critical-css", action="store_true",
+        help="Inline the stylesheet rules generated pages use and load the full stylesheet without blocking",
+    )
+    parser.add_argument(
+        "--search-index", action="store_true",
+        help="Write a sharded full-text search index of the pages to public/search/",
+    )
+    parser.add_argument(
+        "--minify", action="store_true", help="Strip comments and insignificant whitespace from generated pages"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Render every block instead of reusing cached fragments"
+    )
+    parser.add_argument(
+        "--cache-size", type=int, default=64, help="Maximum size of the block fragment cache in MB"
+    )
+    parser.add_argument(
+        "--precompress", action="store_true", help="Write .gz copies of text files in public/ after the build"
+    )
+    parser.add_argument(
+        "--gzip-level", type=int, default=9, help="Compression level used by --precompress"
+    )
+    parser.add_argument(
+        "--profile", nargs="?", const="build-trace.json", metavar="PATH",
+        help="Write a Chrome trace-event file of the build phases (default: build-trace.json)",
+    )
+    parser.add_argument(
+        "--cprofile", metavar="PATH", help="Also write cProfile statistics for the build to PATH"
+    )
+    parser.add_argument(
+        "--link-report", metavar="PATH", help="Write the site-wide index of internal links and broken links to PATH"
+    )
+    parser.add_argument(
+        "--strict-links", action="store_true", help="Fail the build if any internal link or image is broken"
+    )
+    parser.add_argument(
+        "--report", metavar="PATH", help="Write a JSON report of per-page sizes and timings to PATH"
+    )
+    parser.add_argument(
+        "--report-top", type=int, default=10, help="Number of slowest and largest pages listed in the report"
+    )
+    args = parser.parse_args(argv)
+    if args.pipeline and args.jobs > 1:
+        parser.error("--pipeline renders pages in one process and cannot be combined with --jobs")
+    return args
+
+
+class Site:
+    def __init__(self, root, shard=None):
+        self.root = root
+        self.shard = shard
+        self.static_path = os.path.join(root, "static")
+        self.content_path = os.path.join(root, "content")
+        self.template_path = os.path.join(root, "template.html")
+        # Each shard writes its own output and manifest, so shards can run side by side.
+        output_root = root if shard is None else shard_path(root, shard)
+        self.public_path = os.path.join(output_root, "public")
+        self.manifest_path = os.path.join(output_root, ".build_manifest.json")
+        self.cache_path = os.path.join(root, ".cache", "fragments.sqlite")
+
+
+def shard_path(root, shard):
+    return os.path.join(root, "shards", f"{shard[0]}-of-{shard[1]}")
+
+
+def page_filters(args, site, manifest):
+    # The filters applied to every page's HTML; call after static files are synced.
+    filters = []
+    # Images are matched by their plain names, so this runs before fingerprinting renames them.
+    if not args.no_image_sizes:
+        filters.append(image_attributes(site.static_path, site.public_path, manifest))
+    # Also before fingerprinting, since it looks stylesheets up by their plain names.
+    if args.critical_css:
+        templates = [site.template_path] + find_layouts(site.content_path)
+        filters.append(critical_css_filter(site.static_path, site.public_path, manifest, templates))
+    if args.fingerprint:
+        filters.append(fingerprint_assets(site.static_path, site.public_path, manifest))
+    else:
+        remove_stale_fingerprints(site.public_path, manifest)
+    if args.minify:
+        filters.append(minify_html)
+    manifest.use_options(
+        {
+            "fingerprint": args.fingerprint,
+            "image_sizes": not args.no_image_sizes,
+            "critical_css": args.critical_css,
+            "minify": args.minify,
+            "search_index": args.search_index,
+        }
+    )
+    return filters
+
+
+def update_search_index(args, site, manifest):
+    if args.search_index:
+        written = write_search_index(manifest, site.public_path)
+        if written:
+            print(f"Updated {written} search index files")
+    else:
+        remove_search_index(site.public_path, manifest)
+
+
+def report_broken_links(args, site, manifest):
+    with profiling.span("check links"):
+        broken = check_links(manifest, site.public_path, args.link_report)
+    for source, url in broken:
+        print(f"Broken link in {source}: {url}")
+    if broken and args.strict_links:
+        raise Exception(f"Found {len(broken)} broken links")
+
+
+def build(args, site=None, manifest=None):
+    if site is None:
+        site = Site(os.getcwd(), parse_shard(args.shard) if args.shard else None)
+    if manifest is None:
+        manifest = Manifest(site.manifest_path, force=args.force)
+    manifest.begin_build()
+    manifest.shard = list(site.shard) if site.shard is not None else None
+
+    with profiling.span("copy static"):
+        if args.clean and os.path.exists(site.public_path):
+            shutil.rmtree(site.public_path)
+        sync_directory(site.static_path, site.public_path, manifest, args.hash_assets)
+        filters = page_filters(args, site, manifest)
+
+    cache = None
+    if not args.no_cache:
+        cache = FragmentCache(site.cache_path, max_bytes=args.cache_size * 1024 * 1024)
+
+    report = BuildReport() if args.report else None
+    pipeline = None
+    if args.pipeline:
+        pipeline = {"io_threads": args.io_threads, "depth": args.queue_depth}
+    with profiling.span("generate pages"):
+        generate_pages_recursive(
+            site.content_path, site.template_path, site.public_path, manifest, args.jobs, cache, report, pipeline,
+            filters, args.search_index, site.shard,
+        )
+    if args.explain:
+        for source, reason in manifest.reasons.items():
+            print(f"Rebuilt {source}: {reason}")
+
+    with profiling.span("finish"):
+        if cache is not None:
+            cache.trim()
+            cache.close()
+        manifest.prune()
+        # A shard only sees some of the pages; the index and links are handled by the merge.
+        if site.shard is None:
+            update_search_index(args, site, manifest)
+        if args.precompress:
+            with profiling.span("precompress"):
+                precompress_directory(site.public_path, manifest, args.gzip_level)
+        else:
+            remove_compressed(manifest)
+        manifest.save()
+
+    if site.shard is None:
+        report_broken_links(args, site, manifest)
+
+    if report is not None:
+        report.write(args.report, args.report_top)
+        print(report.summary(args.report_top))
+    return manifest
+
+
+def merge(args, site=None):
+    if site is None:
+        site = Site(os.getcwd())
+    with profiling.span("merge shards"):
+        manifest = merge_shards(args.merge, site.public_path, site.manifest_path)
+    if manifest.options.get("search_index"):
+        print(f"Wrote {write_search_index(manifest, site.public_path)} search index files")
+    if args.precompress:
+        with profiling.span("precompress"):
+            precompress_directory(site.public_path, manifest, args.gzip_level)
+    else:
+        remove_compressed(manifest)
+    manifest.save()
+    report_broken_links(args, site, manifest)
+    return manifest
 
 
 def main():
-    static_path = os.path.join(os.getcwd(), "static")
-    public_path = os.path.join(os.getcwd(), "public")
-    copy_directory(static_path, public_path)
+    args = parse_args()
+    if args.profile:
+        profiling.enable()
+    profiler = None
+    if args.cprofile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    with profiling.span("build"):
+        if args.merge:
+            merge(args)
+        else:
+            build(args)
 
-    content_path = os.path.join(os.getcwd(), "content")
-    template_path = os.path.join(os.getcwd(), "template.html")
-    destination_path = os.path.join(os.getcwd(), "public")
-    generate_pages_recursive(content_path, template_path, destination_path)
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.cprofile)
+        print(f"Wrote cProfile statistics to {args.cprofile}")
+    if args.profile:
+        profiling.write_trace(args.profile)
+        print(f"Wrote build trace to {args.profile}")
 
-main()
+# Worker processes re-import this module, so only build when run as a script.
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+
+from templates import load_template
+
+
+MANIFEST_VERSION = 4
+# Per-page links and search terms live next to the manifest in their own file. They are only
+# needed by link checking and the search index, and change only when a page is rebuilt.
+PAGE_INDEX_NAME = ".build_index.json"
+
+
+def file_hash(path):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class Manifest:
+    # Records, for every page, the hash of each file it was built from (its dependency
+    # graph) and the hash of the output, so a build only redoes pages whose inputs changed.
+    def __init__(self, path, force=False):
+        self.path = path
+        self.force = force
+        self.pages = {}
+        self.assets = []
+        # Path -> [mtime_ns, size, hash]; lets unchanged files skip rehashing.
+        self.files = {}
+        # Fingerprinted copies of static assets: site path -> fingerprinted site path.
+        self.fingerprints = {}
+        # Content hash -> [width, height] of static images, or None if the format is unknown.
+        self.image_sizes = {}
+        # "<stylesheet hash>:<tag set hash>" -> critical rules of that stylesheet.
+        self.critical_css = {}
+        # Search index file name -> hash of what was last written.
+        self.search_files = {}
+        # .gz copies written by --precompress, which only ever touches these.
+        self.compressed = []
+        # [index, count] of a shard build; None for a whole site.
+        self.shard = None
+        # Build options that change page output, as of the last build.
+        self.options = {}
+        self.stale_options = False
+        self.seen = set()
+        self.reasons = {}
+        self._hashes = {}
+        self.page_index_path = os.path.join(os.path.dirname(path), PAGE_INDEX_NAME)
+        self._page_index = None
+        self._page_index_changed = False
+
+        if os.path.exists(path):
+            with open(path, "r") as file:
+                data = json.load(file)
+            if data.get("version") == MANIFEST_VERSION:
+                self.pages = data.get("pages", {})
+                self.assets = data.get("assets", [])
+                self.files = data.get("files", {})
+                self.fingerprints = data.get("fingerprints", {})
+                self.image_sizes = data.get("image_sizes", {})
+                self.critical_css = data.get("critical_css", {})
+                self.search_files = data.get("search_files", {})
+                self.compressed = data.get("compressed", [])
+                self.options = data.get("options", {})
+                self.shard = data.get("shard")
+
+    def page_index(self):
+        # Source path -> {"links": [...], "search": {...} or None}, read on first use.
+        if self._page_index is None:
+            self._page_index = {}
+            if os.path.exists(self.page_index_path):
+                with open(self.page_index_path, "r") as file:
+                    data = json.load(file)
+                if data.get("version") == MANIFEST_VERSION:
+                    self._page_index = data.get("pages", {})
+        return self._page_index
+
+    def index_page(self, source, links=(), search=None):
+        # source is a key of pages, as returned by _key.
+        self.page_index()[source] = {
+            # Kept so unchanged pages still take part in link checking.
+            "links": list(links),
+            # Title and weighted terms for the search index, when it is being built.
+            "search": search,
+        }
+        self._page_index_changed = True
+
+    def begin_build(self):
+        # Forget per-build state so one Manifest can serve repeated builds.
+        self.seen = set()
+        self.reasons = {}
+        self._hashes = {}
+
+    def use_options(self, options):
+        # Pages built with different output options are all rebuilt.
+        self.stale_options = options != self.options
+        self.options = options
+
+    def hash_of(self, path):
+        # Each file is hashed at most once per build, and not at all if its stat is unchanged.
+        key = self._key(path)
+        if key in self._hashes:
+            return self._hashes[key]
+
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self._hashes[key] = None
+            return None
+        known = self.files.get(key)
+        if known is not None and known[:2] == [stat.st_mtime_ns, stat.st_size]:
+            digest = known[2]
+        else:
+            digest = file_hash(path)
+            self.files[key] = [stat.st_mtime_ns, stat.st_size, digest]
+        self._hashes[key] = digest
+        return digest
+
+    def dependencies(self, source_path, template_path):
+        paths = [source_path] + sorted(load_template(template_path).dependencies)
+        return {self._key(path): self.hash_of(path) for path in paths}
+
+    def dependents(self, path):
+        # Source paths of the pages that were built from path or refer to it as an asset.
+        key = self._key(path)
+        return [
+            source for source, entry in self.pages.items()
+            if key in entry["deps"] or key in entry.get("assets", {})
+        ]
+
+    def explain(self, source_path, template_path, dest_path):
+        # Returns why the page needs rebuilding, or None if it is up to date.
+        key = self._key(source_path)
+        self.seen.add(key)
+
+        entry = self.pages.get(key)
+        if entry is None:
+            return "new page"
+        if self.force:
+            return "forced rebuild"
+        if self.stale_options:
+            return "build options changed"
+        if entry["output_path"] != self._key(dest_path):
+            return "output path changed"
+
+        deps = self.dependencies(source_path, template_path)
+        for dep, digest in deps.items():
+            if dep not in entry["deps"]:
+                return f"now depends on {dep}"
+            if entry["deps"][dep] != digest:
+                return f"{dep} changed"
+        for dep in entry["deps"]:
+            if dep not in deps:
+                return f"no longer depends on {dep}"
+        for dep, digest in entry.get("assets", {}).items():
+            if self.hash_of(dep) != digest:
+                return f"{dep} changed"
+
+        output_hash = self.hash_of(dest_path)
+        if output_hash is None:
+            return "output missing"
+        if output_hash != entry["output_hash"]:
+            return "output modified"
+        return None
+
+    def is_fresh(self, source_path, template_path, dest_path):
+        reason = self.explain(source_path, template_path, dest_path)
+        if reason is not None:
+            self.reasons[self._key(source_path)] = reason
+        return reason is None
+
+    def record(self, source_path, template_path, dest_path, output_hash, links=(), assets=(), search=None):
+        key = self._key(source_path)
+        self.seen.add(key)
+        self.pages[key] = {
+            "deps": self.dependencies(source_path, template_path),
+            "output_path": self._key(dest_path),
+            "output_hash": output_hash,
+            # Static files whose content the output depends on, such as fingerprinted assets.
+            "assets": {self._key(path): self.hash_of(path) for path in sorted(assets)},
+        }
+        self.index_page(key, links, search)
+        # The output was just written, so remember its stat alongside the known hash.
+        output_key = self._key(dest_path)
+        stat = os.stat(dest_path)
+        self.files[output_key] = [stat.st_mtime_ns, stat.st_size, output_hash]
+        self._hashes[output_key] = output_hash
+
+    def prune(self):
+        # Remove outputs whose sources were not seen during this build.
+        return [self.forget(key) for key in sorted(set(self.pages) - self.seen)]
+
+    def forget(self, source_path):
+        key = self._key(source_path)
+        entry = self.pages.pop(key, None)
+        if entry is None:
+            return None
+        if self.page_index().pop(key, None) is not None:
+            self._page_index_changed = True
+        output_path = entry["output_path"]
+        if os.path.exists(output_path):
+            os.remove(output_path)
+            print(f"Removed stale page {output_path}")
+        return output_path
+
+    def save(self):
+        # Keep the stat of every file this build looked at, not only page dependencies: static
+        # files hashed for image sizes, fingerprints or critical CSS are needed by the next
+        # build too, even when no page refers to them.
+        used = set(self._hashes)
+        for entry in self.pages.values():
+            used.update(entry["deps"])
+            used.update(entry.get("assets", {}))
+            used.add(entry["output_path"])
+        self.files = {path: stat for path, stat in self.files.items() if path in used}
+        hashes = {stat[2] for stat in self.files.values()}
+        self.image_sizes = {digest: size for digest, size in self.image_sizes.items() if digest in hashes}
+        self.critical_css = {key: css for key, css in self.critical_css.items() if key.split(":")[0] in hashes}
+
+        data = {
+            "version": MANIFEST_VERSION,
+            "pages": self.pages,
+            "assets": self.assets,
+            "files": self.files,
+            "fingerprints": self.fingerprints,
+            "image_sizes": self.image_sizes,
+            "critical_css": self.critical_css,
+            "search_files": self.search_files,
+            "compressed": self.compressed,
+            "options": self.options,
+            "shard": self.shard,
+        }
+        _write_json(self.path, data)
+
+        if self._page_index_changed:
+            pages = {source: entry for source, entry in self._page_index.items() if source in self.pages}
+            _write_json(self.page_index_path, {"version": MANIFEST_VERSION, "pages": pages}, indent=None)
+            self._page_index_changed = False
+
+    def _key(self, path):
+        return os.path.relpath(path)
+
+
+def _write_json(path, data, indent=1):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(data, file, indent=indent, sort_keys=True)
+    os.replace(tmp_path, path)
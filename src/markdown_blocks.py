@@ -2,7 +2,7 @@ import re
 from enum import Enum
 from functools import reduce
 
-from htmlnode import ParentNode
+from htmlnode import FragmentNode, ParentNode, count_nodes
 from inline_markdown import text_to_textnodes
 from textnode import text_node_to_html_node
 
@@ -15,9 +15,13 @@ class BlockType(Enum):
     UNORDERED_LIST = "unordered_list"
     ORDERED_LIST = "ordered_list"
 
+_HEADING_PATTERN = re.compile(r"(#{1,6}) .")
+
 def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
-    html_nodes = [block_to_html_node(block) for block in blocks]
+    return blocks_to_html_node(iter_blocks(markdown.split("\n")))
+
+def blocks_to_html_node(typed_blocks):
+    html_nodes = [block_to_html_node(block, block_type) for block_type, block in typed_blocks]
     return ParentNode(tag="div", children=html_nodes)
 
 def markdown_to_blocks(markdown):
@@ -26,40 +30,56 @@ def markdown_to_blocks(markdown):
     blocks = [block for block in blocks if block != ""]
     return blocks
 
-def is_block_quote(block):
-    for line in block.splitlines():
-        if not line.startswith(">"):
-            return False
-    return True
-
-def is_unordered_list(block):
-    for line in block.splitlines():
-        if not (line.startswith("* ") or line.startswith("- ")):
-            return False
-    return True
+def iter_blocks(lines):
+    # Yields (block_type, block) pairs from any iterable of lines, such as an open file.
+    # Blank lines separate blocks, matching markdown_to_blocks.
+    block_lines = []
+    for line in lines:
+        if line.endswith("\n"):
+            line = line[:-1]
+        if line == "":
+            if block_lines:
+                yield from _typed_block(block_lines)
+                block_lines = []
+        else:
+            block_lines.append(line)
+    if block_lines:
+        yield from _typed_block(block_lines)
 
-def is_ordered_list(block):
-    for i, line in enumerate(block.splitlines()):
-        if not line.startswith(f"{i+1}. "):
-            return False
-    return True
+def _typed_block(block_lines):
+    block = "\n".join(block_lines).strip()
+    if block != "":
+        yield block_to_block_type(block), block
 
 def block_to_block_type(block):
-    if re.match(r"#{1,6} .", block):
+    if _HEADING_PATTERN.match(block):
         return BlockType.HEADING
-    elif len(block.splitlines()) > 1 and block.startswith("```") and block.endswith("```"):
+
+    lines = block.splitlines()
+    if len(lines) > 1 and block.startswith("```") and block.endswith("```"):
         return BlockType.CODE
-    elif is_block_quote(block):
+
+    # Check every list and quote rule in one pass over the lines.
+    quote = unordered = ordered = True
+    for i, line in enumerate(lines):
+        quote = quote and line.startswith(">")
+        unordered = unordered and (line.startswith("* ") or line.startswith("- "))
+        ordered = ordered and line.startswith(f"{i+1}. ")
+        if not (quote or unordered or ordered):
+            return BlockType.PARAGRAPH
+
+    if quote:
         return BlockType.QUOTE
-    elif is_unordered_list(block):
+    elif unordered:
         return BlockType.UNORDERED_LIST
-    elif is_ordered_list(block):
+    elif ordered:
         return BlockType.ORDERED_LIST
     else:
         return BlockType.PARAGRAPH
 
-def block_to_html_node(block):
-    block_type = block_to_block_type(block)
+def block_to_html_node(block, block_type=None):
+    if block_type is None:
+        block_type = block_to_block_type(block)
     if block_type == BlockType.QUOTE:
         return block_quote_to_html_node(block)
     elif block_type == BlockType.UNORDERED_LIST:
@@ -73,6 +93,19 @@ def block_to_html_node(block):
     else:
         return block_paragraph_to_html_node(block)
 
+def cached_block_to_html_node(block, block_type=None, cache=None):
+    # Cached blocks come back as pre-rendered HTML instead of a node tree, along with the
+    # size of the tree so statistics do not depend on the cache.
+    if cache is None or len(block) < cache.min_block_size:
+        return block_to_html_node(block, block_type)
+
+    fragment = cache.get(block)
+    if fragment is None:
+        html_node = block_to_html_node(block, block_type)
+        fragment = html_node.to_html(), count_nodes(html_node)
+        cache.put(block, *fragment)
+    return FragmentNode(*fragment)
+
 def block_quote_to_html_node(block):
     # Remove the ">" symbol from each line.
     new_lines = []
@@ -121,7 +154,7 @@ def block_code_to_html_node(block):
 
 def block_heading_to_html_node(block):
     # Find the heading size and remove the # symbols from the block
-    heading_chars = re.match(r"(#{1,6}) .", block).group(1)
+    heading_chars = _HEADING_PATTERN.match(block).group(1)
     heading_size = len(heading_chars)
     new_block = block[(heading_size+1):]
 
@@ -0,0 +1,197 @@
+import re
+
+
+# Whitespace next to these tags never renders, so it can be dropped rather than collapsed.
+BLOCK_TAGS = {
+    "!doctype", "html", "head", "body", "title", "meta", "link", "script", "style", "base",
+    "div", "p", "pre", "blockquote", "ul", "ol", "li", "dl", "dt", "dd", "table", "thead", "tbody",
+    "tfoot", "tr", "th", "td", "h1", "h2", "h3", "h4", "h5", "h6", "hr", "br", "header", "footer",
+    "main", "nav", "section", "article", "aside", "figure", "figcaption", "form", "fieldset",
+}
+# Elements whose content is passed through untouched.
+RAW_TAGS = {"pre", "code", "textarea", "script", "style"}
+
+# Only ASCII whitespace collapses in HTML; a non-breaking space is content.
+_WHITESPACE_PATTERN = re.compile(r"[ \t\n\r\f]+")
+_TAG_PATTERN = re.compile(r"<(/?)([^\s>/]+)(.*?)(/?)>$", re.DOTALL)
+_ATTRIBUTE_PATTERN = re.compile(r"""[ \t\n\r\f]+([^\s=>/"']+)(?:[ \t\n\r\f]*=[ \t\n\r\f]*("[^"]*"|'[^']*'|[^\s>"']+))?""")
+_UNQUOTED_VALUE_PATTERN = re.compile(r"[^\s\"'=<>`]+")
+
+
+def minify_html(chunks, dest_path=None, dependencies=None):
+    # Page filter that minifies HTML as it streams past, one chunk at a time.
+    minifier = HTMLMinifier()
+    for chunk in chunks:
+        output = minifier.feed(chunk)
+        if output:
+            yield output
+    output = minifier.close()
+    if output:
+        yield output
+
+
+class HTMLMinifier:
+    # Collapses whitespace, drops comments and unquotes attribute values where that is safe.
+    # Tags and comments may be split across chunks; the unfinished part is held until the
+    # next chunk completes it.
+    def __init__(self):
+        self.carry = ""
+        # Name of the raw element being passed through, such as "pre".
+        self.raw = None
+        self.pending_space = False
+        self.after_block = True
+
+    def feed(self, chunk):
+        text = self.carry + chunk
+        self.carry = ""
+        output = []
+        position = 0
+        length = len(text)
+        while position < length:
+            if self.raw is not None:
+                position = self._pass_raw(text, position, output)
+                if self.raw is not None:
+                    break
+                continue
+
+            start = text.find("<", position)
+            if start == -1:
+                self._text(text[position:], output)
+                break
+            if start > position:
+                self._text(text[position:start], output)
+            position = start
+
+            if text.startswith("<!--", position) or "<!--".startswith(text[position:]):
+                end = text.find("-->", position + 4)
+                if end == -1:
+                    self.carry = text[position:]
+                    break
+                comment = text[position:end + 3]
+                if comment.startswith("<!--[if"):
+                    # Conditional comments are markup for old browsers, not commentary.
+                    self._tag(comment, "!--", output)
+                position = end + 3
+                continue
+
+            if position + 1 == length:
+                self.carry = text[position:]
+                break
+            next_char = text[position + 1]
+            if not (next_char.isalpha() or next_char in "/!"):
+                self._text("<", output)
+                position += 1
+                continue
+
+            end = text.find(">", position)
+            if end == -1:
+                self.carry = text[position:]
+                break
+            self._element(text[position:end + 1], output)
+            position = end + 1
+        return "".join(output)
+
+    def close(self):
+        output = []
+        if self.carry:
+            if self.raw is not None:
+                output.append(self.carry)
+            else:
+                self._text(self.carry, output)
+        self.carry = ""
+        self.raw = None
+        return "".join(output)
+
+    def _pass_raw(self, text, position, output):
+        # Copies raw content up to and including the closing tag; returns the new position.
+        closing = "</" + self.raw
+        start = text.lower().find(closing, position)
+        if start == -1:
+            # Hold back anything that could be the start of the closing tag.
+            keep = len(closing) - 1
+            safe = max(position, len(text) - keep)
+            output.append(text[position:safe])
+            self.carry = text[safe:]
+            return len(text)
+        end = text.find(">", start)
+        if end == -1:
+            output.append(text[position:start])
+            self.carry = text[start:]
+            return len(text)
+        output.append(text[position:start])
+        self.raw = None
+        self._element(text[start:end + 1], output)
+        return end + 1
+
+    def _text(self, text, output):
+        collapsed = _WHITESPACE_PATTERN.sub(" ", text)
+        if collapsed.startswith(" "):
+            self.pending_space = True
+            collapsed = collapsed[1:]
+        if not collapsed:
+            return
+        trailing = collapsed.endswith(" ")
+        if trailing:
+            collapsed = collapsed[:-1]
+        if self.pending_space and not self.after_block:
+            output.append(" ")
+        output.append(collapsed)
+        self.pending_space = trailing
+        self.after_block = False
+
+    def _element(self, tag, output):
+        match = _TAG_PATTERN.match(tag)
+        if match is None:
+            self._tag(tag, "", output)
+            return
+        closing, name, _, self_closing = match.groups()
+        name = name.lower()
+        self._tag(_minify_tag(tag, match), name, output)
+        if name in RAW_TAGS and not closing and not self_closing:
+            self.raw = name
+
+    def _tag(self, tag, name, output):
+        block = name in BLOCK_TAGS
+        if self.pending_space and not block and not self.after_block:
+            output.append(" ")
+        self.pending_space = False
+        output.append(tag)
+        self.after_block = block
+
+
+def _minify_tag(tag, match):
+    closing, name, attributes, self_closing = match.groups()
+    if name.startswith("!"):
+        return tag
+    parts = ["<", closing, name]
+    position = 0
+    unquoted = False
+    for attribute in _ATTRIBUTE_PATTERN.finditer(attributes):
+        if attribute.start() != position:
+            return tag
+        parts.append(" " + attribute.group(1))
+        value = attribute.group(2)
+        unquoted = False
+        if value is not None:
+            minified = _minify_value(value)
+            unquoted = minified != value
+            parts.append("=" + minified)
+        position = attribute.end()
+    if attributes[position:].strip():
+        # Something the pattern does not understand; leave the tag as written.
+        return tag
+    if self_closing and unquoted:
+        # Keep "/" from being read as part of an unquoted value.
+        parts.append(" ")
+    parts.append(self_closing)
+    parts.append(">")
+    return "".join(parts)
+
+
+def _minify_value(value):
+    if value[0] in "\"'":
+        inner = value[1:-1]
+        # A trailing "/" would read as the end of a self-closing tag.
+        if _UNQUOTED_VALUE_PATTERN.fullmatch(inner) and not inner.endswith("/"):
+            return inner
+    return value
@@ -1,48 +1,287 @@
+import hashlib
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
-from markdown_blocks import markdown_to_html_node
+import profiling
+from htmlnode import FragmentNode, count_nodes
+from links import block_links
+from search_index import block_terms
+from shards import in_shard
+from markdown_blocks import cached_block_to_html_node, iter_blocks
+from templates import find_layout, load_template
 
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path):
+def generate_pages_recursive(
+    dir_path_content, template_path, dest_dir_path, manifest=None, jobs=1, cache=None, report=None, pipeline=None,
+    filters=(), index_search=False, shard=None,
+):
+    pages = collect_pages(dir_path_content, template_path, dest_dir_path)
+    if shard is not None:
+        pages = [page for page in pages if in_shard(page[0], dir_path_content, shard)]
+
+    if manifest is not None:
+        stale_pages = []
+        for page in pages:
+            if manifest.is_fresh(*page):
+                print(f"Skipping unchanged page {page[0]}")
+            else:
+                stale_pages.append(page)
+        if report is not None:
+            report.skipped += len(pages) - len(stale_pages)
+        pages = stale_pages
+
+    for page, stats in zip(pages, generate_pages(pages, jobs, cache, pipeline, filters, index_search)):
+        print(f"Generating page from {page[0]} to {page[2]} using {page[1]}")
+        if manifest is not None:
+            manifest.record(*page, stats["output_hash"], stats["links"], stats["assets"], stats["search"])
+        if report is not None:
+            report.add(stats)
+
+def collect_pages(dir_path_content, template_path, dest_dir_path):
     if not os.path.exists(dir_path_content):
         raise Exception("Content directory does not exist")
 
-    contents = os.listdir(dir_path_content)
-    for item in contents:
+    template_path = find_layout(dir_path_content, template_path)
+    pages = []
+    for item in sorted(os.listdir(dir_path_content)):
         item_path = os.path.join(dir_path_content, item)
         if os.path.isfile(item_path):
+            # Layouts and partials live next to content but are not pages.
+            if item.startswith("_"):
+                continue
             item_name = item.split(".")[0]
             dest_name = item_name + ".html"
             item_dest_path = os.path.join(dest_dir_path, dest_name)
-            generate_page(item_path, template_path, item_dest_path)
+            pages.append((item_path, template_path, item_dest_path))
         else:
             item_dest_path = os.path.join(dest_dir_path, item)
-            generate_pages_recursive(item_path, template_path, item_dest_path)
+            pages.extend(collect_pages(item_path, template_path, item_dest_path))
+    return pages
+
+def page_for_source(dir_path_content, template_path, dest_dir_path, source_path):
+    # Builds the same (source, template, destination) tuple collect_pages would for one file.
+    template_path = find_layout(dir_path_content, template_path)
+    relative_dir = os.path.relpath(os.path.dirname(source_path), dir_path_content)
+    if relative_dir != os.curdir:
+        for part in relative_dir.split(os.sep):
+            dir_path_content = os.path.join(dir_path_content, part)
+            dest_dir_path = os.path.join(dest_dir_path, part)
+            template_path = find_layout(dir_path_content, template_path)
+
+    dest_name = os.path.basename(source_path).split(".")[0] + ".html"
+    return (source_path, template_path, os.path.join(dest_dir_path, dest_name))
+
+def generate_pages(pages, jobs=1, cache=None, pipeline=None, filters=(), index_search=False):
+    # Yields each page's build statistics, in the same order as pages.
+    # pipeline, if given, holds generate_pages_pipelined options such as io_threads and depth.
+    if pipeline is not None:
+        # Imported here because the pipeline module builds on this one.
+        from pipeline import generate_pages_pipelined
+        yield from generate_pages_pipelined(pages, cache, filters=filters, index_search=index_search, **pipeline)
+        return
+
+    if jobs <= 1 or len(pages) <= 1:
+        for page in pages:
+            yield _generate_page_job(page, cache, filters, index_search)
+        return
+
+    job = partial(_generate_page_worker, cache=cache, filters=filters, index_search=index_search)
+    chunksize = max(1, len(pages) // (jobs * 4))
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(profiling.is_enabled(),)
+    ) as executor:
+        for stats, events in executor.map(job, pages, chunksize=chunksize):
+            profiling.add_events(events)
+            yield stats
+
+def _init_worker(profile):
+    # A forked worker starts with a copy of the parent's events; drop them so the parent's
+    # spans are not sent back and recorded again.
+    if profile:
+        profiling.enable()
+    else:
+        profiling.disable()
+
+def _generate_page_worker(page, cache=None, filters=(), index_search=False):
+    # Worker processes record their own spans and send them back with the result.
+    stats = _generate_page_job(page, cache, filters, index_search)
+    return stats, profiling.drain()
 
-def extract_title(markdown):
-    for line in markdown.splitlines():
+def _generate_page_job(page, cache=None, filters=(), index_search=False):
+    try:
+        with profiling.span("page", path=page[0]):
+            return generate_page(*page, cache=cache, filters=filters, index_search=index_search)
+    except Exception as error:
+        raise Exception(f"Failed to generate page {page[0]}: {error}") from error
+
+def generate_page(from_path, template_path, dest_path, cache=None, filters=(), index_search=False):
+    # Returns the page's output hash along with size and timing statistics for build reports.
+    # filters are applied in order to the rendered HTML chunks; see render_chunks. With
+    # index_search, the page's title and weighted search terms are returned too.
+    template = load_template(template_path)
+
+    # Blocks are parsed while the page is rendered, so only one block's nodes are alive at a time.
+    start = time.perf_counter()
+    links = []
+    terms = {} if index_search else None
+    with open(from_path, "r") as source:
+        with profiling.span("scan title"):
+            title, content = parse_page(source, cache, links, terms)
+        scan_time = time.perf_counter() - start
+
+        # Worker processes may create the same directory at once.
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+
+        context = {"Title": title, "Content": content}
+        assets = set()
+        start = time.perf_counter()
+        # The page streams into a temporary file that replaces dest_path only once rendering
+        # succeeds, so an error keeps the previous page and readers never see half of one.
+        tmp_path = dest_path + ".tmp"
+        try:
+            # Template fill and writes interleave with parsing here, whose block split and
+            # inline parse spans nest inside this one.
+            with profiling.span("render"), open(tmp_path, "w") as file:
+                writer = TimedWriter(file)
+                writer.writelines(render_chunks(template, context, dest_path, filters, assets))
+            write_time = writer.time
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, dest_path)
+        render_time = time.perf_counter() - start - write_time - content.parse_time
+    if cache is not None:
+        cache.flush()
+
+    output_hash, output_bytes = written_output(dest_path, writer)
+    return {
+        "source": from_path,
+        "output": dest_path,
+        "output_hash": output_hash,
+        "source_bytes": os.path.getsize(from_path),
+        "output_bytes": output_bytes,
+        "blocks": content.blocks,
+        "cached_blocks": content.cached_blocks,
+        "nodes": content.nodes,
+        "links": links,
+        "assets": sorted(assets),
+        "search": {"title": title, "terms": terms} if index_search else None,
+        "parse_time": scan_time + content.parse_time,
+        "render_time": render_time,
+        "write_time": write_time,
+    }
+
+def written_output(dest_path, writer):
+    # Returns the hash and size of the page a TimedWriter wrote to dest_path.
+    if os.linesep == "\n":
+        return writer.hasher.hexdigest(), writer.bytes
+    # Newlines were translated on the way out, so hash what actually landed on disk.
+    with open(dest_path, "rb") as file:
+        output = file.read()
+    return hashlib.sha256(output).hexdigest(), len(output)
+
+def render_chunks(template, context, dest_path, filters, assets):
+    # Yields the page's HTML chunks after passing them through each filter in turn. A filter
+    # is called as filter(chunks, dest_path, assets) and returns new chunks; it adds the path
+    # of any static file its output depends on to the assets set.
+    chunks = template.iter_render(context)
+    for page_filter in filters:
+        chunks = page_filter(chunks, dest_path, assets)
+    return chunks
+
+def parse_page(source, cache=None, links=None, terms=None):
+    # Returns the page title and a PageContent that parses the blocks of source while it is
+    # rendered. source is a seekable text file: a cheap scan finds the title first, so a page
+    # without one fails before any output is written.
+    # If links is a list, the URL of every link and image on the page is appended to it.
+    # If terms is a dict, the page's weighted search terms are added to it.
+    title = scan_title(source)
+    if title is None:
+        raise Exception("No h1 header provided in the markdown")
+    source.seek(0)
+    return title, PageContent(source, cache, links, terms)
+
+def scan_title(lines):
+    # Returns the text of the first "# " heading that starts a block, without building blocks:
+    # a block's first line may be indented and the title's trailing whitespace is dropped.
+    block_start = True
+    for line in lines:
+        line = line.rstrip("\n")
+        if line == "":
+            block_start = True
+            continue
+        if block_start:
+            line = line.lstrip()
+            block_start = False
+        line = line.rstrip()
         if line.startswith("# ") and len(line) > 2:
             return line[2:]
+    return None
+
 
-    raise Exception("No h1 header provided in the markdown")
+class PageContent:
+    # The page's content div. Each block is parsed as rendering reaches it, so memory does not
+    # grow with the page. Block and node counts and parse time are known once it has rendered;
+    # blocks taken from the fragment cache are counted separately since they skip parsing.
+    def __init__(self, lines, cache=None, links=None, terms=None):
+        self.lines = lines
+        self.cache = cache
+        self.links = links
+        self.terms = terms
+        self.blocks = 0
+        self.cached_blocks = 0
+        self.nodes = 1
+        self.parse_time = 0.0
 
-def generate_page(from_path, template_path, dest_path):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+    def to_html(self):
+        return "".join(self.iter_html())
 
-    with open(from_path, "r") as file:
-        contents = file.read()
+    def iter_html(self):
+        yield "<div>"
+        blocks = iter_blocks(self.lines)
+        while True:
+            start = time.perf_counter()
+            # Reading the source happens here too, as the splitter asks for lines.
+            with profiling.span("block split"):
+                typed_block = next(blocks, None)
+            if typed_block is None:
+                break
+            block_type, block = typed_block
+            if self.links is not None:
+                self.links.extend(block_links(block, block_type))
+            if self.terms is not None:
+                block_terms(block, block_type, self.terms)
+            with profiling.span("inline parse"):
+                html_node = cached_block_to_html_node(block, block_type, self.cache)
+            self.blocks += 1
+            if isinstance(html_node, FragmentNode):
+                self.cached_blocks += 1
+            self.nodes += count_nodes(html_node)
+            self.parse_time += time.perf_counter() - start
+            yield from html_node.iter_html()
+        yield "</div>"
 
-    with open(template_path, "r") as file:
-        template = file.read()
 
-    html = markdown_to_html_node(contents).to_html()
-    title = extract_title(contents)
-    template = template.replace("{{ Title }}", title)
-    template = template.replace("{{ Content }}", html)
+class TimedWriter:
+    # Separates time spent writing from time spent producing chunks while streaming, and
+    # hashes the encoded output on the way past so the file need not be read back.
+    def __init__(self, file):
+        self.file = file
+        self.time = 0.0
+        self.hasher = hashlib.sha256()
+        self.bytes = 0
 
-    dest_dir = os.path.dirname(dest_path)
-    if not os.path.exists(dest_dir):
-        os.makedirs(dest_dir)
+    def write(self, chunk):
+        data = chunk.encode(self.file.encoding)
+        self.hasher.update(data)
+        self.bytes += len(data)
+        start = time.perf_counter()
+        self.file.write(chunk)
+        self.time += time.perf_counter() - start
 
-    with open(dest_path, "w") as file:
-        file.write(template)
+    def writelines(self, chunks):
+        for chunk in chunks:
+            self.write(chunk)
@@ -0,0 +1,107 @@
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import profiling
+from page_generation import TimedWriter, parse_page, render_chunks, written_output
+from templates import load_template
+
+
+def generate_pages_pipelined(pages, cache=None, io_threads=8, depth=32, filters=(), index_search=False):
+    # Reads and writes run on a thread pool while this thread parses and renders, so
+    # disk and CPU work overlap. At most depth reads and depth writes are in flight,
+    # which bounds memory. Yields each page's statistics in page order.
+    page_iter = iter(pages)
+    reads = deque()
+    writes = deque()
+    with ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix="page-io") as executor:
+        def fill_reads():
+            while len(reads) < depth:
+                page = next(page_iter, None)
+                if page is None:
+                    return
+                reads.append((page, executor.submit(_read_source, page)))
+
+        fill_reads()
+        while reads:
+            page, read_future = reads.popleft()
+            fill_reads()
+            text, source_bytes = read_future.result()
+            html, stats = _render_page(page, text, cache, filters, index_search)
+            stats["source_bytes"] = source_bytes
+            writes.append(executor.submit(_write_page, page, html, stats))
+
+            while writes and (len(writes) > depth or writes[0].done()):
+                yield writes.popleft().result()
+
+        while writes:
+            yield writes.popleft().result()
+    if cache is not None:
+        cache.flush()
+
+
+def _read_source(page):
+    try:
+        with profiling.span("read", path=page[0]), open(page[0], "r") as file:
+            return file.read(), os.fstat(file.fileno()).st_size
+    except Exception as error:
+        raise Exception(f"Failed to generate page {page[0]}: {error}") from error
+
+
+def _render_page(page, text, cache, filters=(), index_search=False):
+    from_path, template_path, dest_path = page
+    try:
+        start = time.perf_counter()
+        links = []
+        terms = {} if index_search else None
+        assets = set()
+        # Blocks are parsed as the template reaches the content, so parsing and rendering share a span.
+        with profiling.span("render", path=from_path):
+            title, content = parse_page(io.StringIO(text), cache, links, terms)
+            context = {"Title": title, "Content": content}
+            html = "".join(render_chunks(load_template(template_path), context, dest_path, filters, assets))
+        render_time = time.perf_counter() - start - content.parse_time
+    except Exception as error:
+        raise Exception(f"Failed to generate page {from_path}: {error}") from error
+
+    stats = {
+        "source": from_path,
+        "output": dest_path,
+        "blocks": content.blocks,
+        "cached_blocks": content.cached_blocks,
+        "nodes": content.nodes,
+        "links": links,
+        "assets": sorted(assets),
+        "search": {"title": title, "terms": terms} if index_search else None,
+        "parse_time": content.parse_time,
+        "render_time": render_time,
+    }
+    return html, stats
+
+
+def _write_page(page, html, stats):
+    dest_path = page[2]
+    try:
+        start = time.perf_counter()
+        with profiling.span("write", path=dest_path):
+            dest_dir = os.path.dirname(dest_path)
+            os.makedirs(dest_dir, exist_ok=True)
+            # Like generate_page, replace the old page only with a complete new one.
+            tmp_path = dest_path + ".tmp"
+            try:
+                with open(tmp_path, "w") as file:
+                    writer = TimedWriter(file)
+                    writer.write(html)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            os.replace(tmp_path, dest_path)
+    except Exception as error:
+        raise Exception(f"Failed to generate page {page[0]}: {error}") from error
+
+    stats["output_hash"], stats["output_bytes"] = written_output(dest_path, writer)
+    stats["write_time"] = time.perf_counter() - start
+    return stats
@@ -0,0 +1,89 @@
+import json
+import os
+import threading
+import time
+
+
+# None while profiling is off, so span() costs one check and a shared no-op object.
+_events = None
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter_ns()
+        event = {
+            "name": self.name,
+            "cat": "build",
+            "ph": "X",
+            "ts": self.start / 1000,
+            "dur": (end - self.start) / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if self.args:
+            event["args"] = self.args
+        _events.append(event)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def enable():
+    global _events
+    _events = []
+
+
+def disable():
+    global _events
+    _events = None
+
+
+def is_enabled():
+    return _events is not None
+
+
+def span(name, **args):
+    if _events is None:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def drain():
+    # Hands over the events recorded so far, e.g. from a worker process to the parent.
+    if _events is None:
+        return []
+    events = list(_events)
+    _events.clear()
+    return events
+
+
+def add_events(events):
+    if _events is not None:
+        _events.extend(events)
+
+
+def write_trace(path):
+    # Chrome trace-event format, readable by chrome://tracing and ui.perfetto.dev.
+    with open(path, "w") as file:
+        json.dump({"traceEvents": _events or [], "displayTimeUnit": "ms"}, file)
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import re
+
+from markdown_blocks import BlockType
+
+
+SEARCH_DIR = "search"
+# Terms are sharded by their first characters, so a query only fetches the shards it needs.
+SHARD_PREFIX_LENGTH = 2
+# A term in the page title or a section heading says more about the page than one in the body.
+HEADING_WEIGHTS = {1: 8, 2: 4}
+DEFAULT_HEADING_WEIGHT = 2
+MIN_TERM_LENGTH = 2
+
+_TERM_PATTERN = re.compile(r"[^\W_]+")
+_LINK_URL_PATTERN = re.compile(r"\]\([^)\n]*\)")
+
+
+def block_terms(block, block_type, terms):
+    # Adds the weighted terms of a markdown block to terms, a dict of term -> weight.
+    if block_type == BlockType.CODE:
+        return
+    weight = 1
+    if block_type == BlockType.HEADING:
+        level = len(block) - len(block.lstrip("#"))
+        weight = HEADING_WEIGHTS.get(level, DEFAULT_HEADING_WEIGHT)
+    text = _LINK_URL_PATTERN.sub("]", block).lower()
+    for term in _TERM_PATTERN.findall(text):
+        if len(term) >= MIN_TERM_LENGTH:
+            terms[term] = terms.get(term, 0) + weight
+
+
+def shard_name(term):
+    prefix = term[:SHARD_PREFIX_LENGTH]
+    if prefix.isascii():
+        return prefix
+    # Keep file names ASCII; clients apply the same rule.
+    return "_" + prefix.encode().hex()
+
+
+def build_search_index(manifest, public_path):
+    # Returns {relative path: JSON text} for the page list and every shard. Page ids are kept
+    # from the previous index so a changed page only touches the shards of its own terms.
+    pages_path = os.path.join(public_path, SEARCH_DIR, "pages.json")
+    previous = []
+    if os.path.exists(pages_path):
+        with open(pages_path, "r") as file:
+            previous = json.load(file)["pages"]
+    ids = {page[0]: page_id for page_id, page in enumerate(previous) if page is not None}
+
+    entries = {}
+    page_index = manifest.page_index()
+    for source, entry in manifest.pages.items():
+        search = page_index.get(source, {}).get("search")
+        if search is None:
+            continue
+        url = "/" + os.path.relpath(entry["output_path"], public_path).replace(os.sep, "/")
+        if url.endswith("/index.html"):
+            url = url[:-len("index.html")]
+        entries[url] = search
+
+    pages = [None] * len(previous)
+    for url in sorted(entries):
+        page_id = ids.get(url)
+        if page_id is None:
+            page_id = len(pages)
+            pages.append(None)
+        pages[page_id] = [url, entries[url]["title"]]
+    while pages and pages[-1] is None:
+        pages.pop()
+
+    shards = {}
+    for page_id, page in enumerate(pages):
+        if page is None:
+            continue
+        for term, weight in entries[page[0]]["terms"].items():
+            shards.setdefault(shard_name(term), {}).setdefault(term, []).append([page_id, weight])
+
+    files = {"pages.json": json.dumps({"pages": pages}, separators=(",", ":"))}
+    for name, terms in shards.items():
+        for postings in terms.values():
+            postings.sort(key=lambda posting: (-posting[1], posting[0]))
+        files[f"{name}.json"] = json.dumps(terms, separators=(",", ":"), sort_keys=True)
+    return files
+
+
+def write_search_index(manifest, public_path):
+    # Writes only the index files whose content changed and removes shards no longer needed.
+    # Returns the number of files written.
+    search_path = os.path.join(public_path, SEARCH_DIR)
+    os.makedirs(search_path, exist_ok=True)
+    files = build_search_index(manifest, public_path)
+    written = 0
+    hashes = {}
+    for name, text in files.items():
+        path = os.path.join(search_path, name)
+        digest = hashlib.sha256(text.encode()).hexdigest()
+        hashes[name] = digest
+        if manifest.search_files.get(name) == digest and os.path.exists(path):
+            continue
+        with open(path, "w") as file:
+            file.write(text)
+        written += 1
+    remove_search_index(public_path, manifest, keep=hashes)
+    manifest.search_files = hashes
+    return written
+
+
+def remove_search_index(public_path, manifest, keep=None):
+    # Deletes index files written by earlier builds that are not in keep.
+    keep = keep or {}
+    for name in sorted(set(manifest.search_files) - set(keep)):
+        path = os.path.join(public_path, SEARCH_DIR, name)
+        if os.path.exists(path):
+            os.remove(path)
+    search_path = os.path.join(public_path, SEARCH_DIR)
+    if not keep and os.path.isdir(search_path) and not os.listdir(search_path):
+        os.rmdir(search_path)
+    manifest.search_files = dict(keep)
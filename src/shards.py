@@ -0,0 +1,140 @@
+import filecmp
+import hashlib
+import os
+import shutil
+
+from manifest import Manifest
+
+
+MANIFEST_NAME = ".build_manifest.json"
+
+
+def parse_shard(text):
+    # "2/4" -> (2, 4): the second of four shards, counting from 1.
+    index, _, count = text.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise Exception(f"Shard must look like i/N, got {text!r}")
+    if count < 1 or not 1 <= index <= count:
+        raise Exception(f"Shard {text} is out of range")
+    return index, count
+
+
+def in_shard(source_path, content_path, shard):
+    # Hashes the path relative to the content directory, so every machine agrees on the split.
+    index, count = shard
+    relative_path = os.path.relpath(source_path, content_path).replace(os.sep, "/")
+    digest = hashlib.sha256(relative_path.encode()).digest()
+    return int.from_bytes(digest[:8], "big") % count == index - 1
+
+
+def merge_shards(shard_paths, public_path, manifest_path):
+    # Combines the public/ trees and manifests of shard builds into public_path and returns
+    # the merged manifest. The shards must be 1 to N of a single split, every page must come
+    # from exactly one shard, and static files that all shards copied must be identical.
+    # The merge is built next to public_path and only replaces it once all checks pass.
+    shards = []
+    owners = {}
+    shard_ids = {}
+    for shard_path in shard_paths:
+        shard_manifest = Manifest(os.path.join(shard_path, MANIFEST_NAME))
+        if shard_manifest.shard is None:
+            raise Exception(f"{shard_path} does not hold a shard build")
+        shard_id = tuple(shard_manifest.shard)
+        if shard_id in shard_ids:
+            raise Exception(f"Shard {shard_id[0]}/{shard_id[1]} is given twice: {shard_ids[shard_id]} and {shard_path}")
+        shard_ids[shard_id] = shard_path
+        shards.append((shard_path, os.path.join(shard_path, "public"), shard_manifest))
+
+    counts = {count for _, count in shard_ids}
+    if len(counts) > 1:
+        raise Exception(f"Shards come from splits of different sizes: {', '.join(map(str, sorted(counts)))}")
+    for count in counts:
+        missing = sorted(set(range(1, count + 1)) - {index for index, _ in shard_ids})
+        if missing:
+            raise Exception(f"Missing shards {', '.join(f'{index}/{count}' for index in missing)}")
+
+    for shard_path, shard_public, shard_manifest in shards:
+        for entry in shard_manifest.pages.values():
+            output = os.path.relpath(entry["output_path"], shard_public)
+            if output in owners:
+                raise Exception(f"Output path {output} is claimed by both {owners[output]} and {shard_path}")
+            owners[output] = shard_path
+
+    options = [shard_manifest.options for _, _, shard_manifest in shards]
+    if any(shard_options != options[0] for shard_options in options):
+        raise Exception("Shards were built with different options")
+
+    manifest = Manifest(manifest_path)
+    manifest.pages = {}
+    manifest.assets = []
+    manifest.files = {}
+    manifest.fingerprints = {}
+    manifest.search_files = {}
+    manifest.compressed = []
+    manifest.shard = None
+    manifest.options = options[0] if options else {}
+
+    merging_path = public_path + ".merging"
+    if os.path.exists(merging_path):
+        shutil.rmtree(merging_path)
+    copied = set()
+    try:
+        for _, shard_public, _ in shards:
+            _merge_tree(shard_public, merging_path, copied)
+    except Exception:
+        shutil.rmtree(merging_path)
+        raise
+    _swap_in(merging_path, public_path)
+
+    for shard_path, shard_public, shard_manifest in shards:
+        shard_index = shard_manifest.page_index()
+        for source, entry in shard_manifest.pages.items():
+            output = os.path.relpath(entry["output_path"], shard_public)
+            manifest.pages[source] = dict(entry, output_path=os.path.relpath(os.path.join(public_path, output)))
+            page = shard_index.get(source, {})
+            manifest.index_page(source, page.get("links", ()), page.get("search"))
+        for asset in shard_manifest.assets:
+            asset = os.path.relpath(os.path.join(public_path, os.path.relpath(asset, shard_public)))
+            if asset not in manifest.assets:
+                manifest.assets.append(asset)
+        for gz_path in shard_manifest.compressed:
+            gz_path = os.path.relpath(os.path.join(public_path, os.path.relpath(gz_path, shard_public)))
+            if gz_path not in manifest.compressed:
+                manifest.compressed.append(gz_path)
+        manifest.fingerprints.update(shard_manifest.fingerprints)
+        manifest.image_sizes.update(shard_manifest.image_sizes)
+        manifest.critical_css.update(shard_manifest.critical_css)
+        print(f"Merged {len(shard_manifest.pages)} pages from {shard_path}")
+    manifest.assets.sort()
+    manifest.compressed.sort()
+    return manifest
+
+
+def _swap_in(new_path, path):
+    # Moves the old tree aside first, so path is only missing between two renames.
+    old_path = path + ".old"
+    if os.path.exists(old_path):
+        shutil.rmtree(old_path)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(new_path, path)
+    if os.path.exists(old_path):
+        shutil.rmtree(old_path)
+
+
+def _merge_tree(source_dir, dest_dir, copied):
+    for dir_path, _, file_names in os.walk(source_dir):
+        relative_dir = os.path.relpath(dir_path, source_dir)
+        os.makedirs(os.path.join(dest_dir, relative_dir), exist_ok=True)
+        for file_name in sorted(file_names):
+            source = os.path.join(dir_path, file_name)
+            dest = os.path.join(dest_dir, relative_dir, file_name)
+            relative_path = os.path.normpath(os.path.join(relative_dir, file_name))
+            if relative_path in copied:
+                if not filecmp.cmp(source, dest, shallow=False):
+                    raise Exception(f"Shards disagree on the contents of {relative_path}")
+                continue
+            shutil.copy2(source, dest)
+            copied.add(relative_path)
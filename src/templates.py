@@ -0,0 +1,101 @@
+import os
+import re
+
+
+LAYOUT_NAME = "_layout.html"
+
+# Matches slots such as "{{ Title }}" and partials such as "{{> _header.html }}".
+_TAG_PATTERN = re.compile(r"\{\{\s*(>?)\s*([^\s}]+)\s*\}\}")
+
+_cache = {}
+
+
+class Template:
+    def __init__(self, path, segments, dependencies):
+        self.path = path
+        # Even indexes hold literal text, odd indexes hold slot names.
+        self.segments = segments
+        self.dependencies = dependencies
+
+    def render(self, context):
+        return "".join(self.iter_render(context))
+
+    def iter_render(self, context):
+        # Slot values may be strings or HTML nodes, which are streamed chunk by chunk.
+        for i, segment in enumerate(self.segments):
+            if i % 2 == 0:
+                yield segment
+                continue
+            value = context.get(segment, "")
+            if isinstance(value, str):
+                yield value
+            else:
+                yield from value.iter_html()
+
+    def render_to(self, writer, context):
+        writer.writelines(self.iter_render(context))
+
+    def is_current(self):
+        for path, mtime in self.dependencies.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return False
+            except FileNotFoundError:
+                return False
+        return True
+
+
+def load_template(path):
+    key = os.path.abspath(path)
+    template = _cache.get(key)
+    if template is None or not template.is_current():
+        template = compile_template(key)
+        _cache[key] = template
+    return template
+
+
+def compile_template(path):
+    segments = [""]
+    dependencies = {}
+    _compile_into(path, segments, dependencies, ())
+    return Template(path, segments, dependencies)
+
+
+def _compile_into(path, segments, dependencies, stack):
+    if path in stack:
+        raise Exception(f"Recursive partial include: {path}")
+    if not os.path.exists(path):
+        raise Exception(f"Template does not exist: {path}")
+
+    dependencies[path] = os.stat(path).st_mtime_ns
+    with open(path, "r") as file:
+        text = file.read()
+
+    position = 0
+    for match in _TAG_PATTERN.finditer(text):
+        segments[-1] += text[position:match.start()]
+        is_partial, name = match.groups()
+        if is_partial:
+            partial_path = os.path.join(os.path.dirname(path), name)
+            _compile_into(os.path.abspath(partial_path), segments, dependencies, stack + (path,))
+        else:
+            segments.append(name)
+            segments.append("")
+        position = match.end()
+    segments[-1] += text[position:]
+
+
+def find_layout(dir_path, template_path):
+    # A "_layout.html" in a content directory applies to it and its subdirectories.
+    layout_path = os.path.join(dir_path, LAYOUT_NAME)
+    if os.path.isfile(layout_path):
+        return layout_path
+    return template_path
+
+
+def find_layouts(dir_path):
+    layouts = []
+    for path, _, file_names in sorted(os.walk(dir_path)):
+        if LAYOUT_NAME in file_names:
+            layouts.append(os.path.join(path, LAYOUT_NAME))
+    return layouts
@@ -0,0 +1,44 @@
+import unittest
+
+from build_report import BuildReport
+
+
+def page_stats(source, source_bytes, parse_time):
+    return {
+        "source": source,
+        "output": source + ".html",
+        "output_hash": "abc",
+        "source_bytes": source_bytes,
+        "output_bytes": source_bytes * 2,
+        "blocks": 3,
+        "cached_blocks": 1,
+        "nodes": 10,
+        "parse_time": parse_time,
+        "render_time": 0.001,
+        "write_time": 0.001,
+    }
+
+
+class TestBuildReport(unittest.TestCase):
+    def test_rankings_and_totals(self):
+        report = BuildReport()
+        report.skipped = 4
+        report.add(page_stats("a", 100, 0.010))
+        report.add(page_stats("b", 300, 0.001))
+        report.add(page_stats("c", 200, 0.050))
+
+        self.assertEqual(["c", "a"], [page["source"] for page in report.slowest(2)])
+        self.assertEqual(["b", "c"], [page["source"] for page in report.largest(2)])
+
+        totals = report.totals()
+        self.assertEqual(3, totals["pages"])
+        self.assertEqual(4, totals["skipped"])
+        self.assertEqual(600, totals["source_bytes"])
+        self.assertEqual(1200, totals["output_bytes"])
+        self.assertNotIn("output_hash", report.to_dict()["pages"][0])
+        self.assertIn("Built 3 pages (4 unchanged)", report.summary())
+        self.assertIn("Blocks: 9 (3 from the fragment cache)", report.summary())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import gzip
+import os
+import unittest
+
+from compression import precompress_directory
+from main import Site, build, parse_args
+from manifest import Manifest
+from test_helpers import TempDirMixin
+
+
+class TestPrecompress(TempDirMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.manifest = Manifest(os.path.join(self.root, "manifest.json"))
+
+    def test_writes_smaller_siblings(self):
+        page = self.write("index.html", "<p>hello</p>" * 100)
+        self.write("tiny.css", "a{}")
+        self.write("image.png", "not text" * 100)
+
+        self.assertEqual(1, precompress_directory(self.root, self.manifest))
+        with gzip.open(page + ".gz", "rt") as file:
+            self.assertEqual("<p>hello</p>" * 100, file.read())
+        self.assertEqual(os.stat(page).st_mtime_ns, os.stat(page + ".gz").st_mtime_ns)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "tiny.css.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "image.png.gz")))
+
+    def test_only_stale_files_are_recompressed(self):
+        page = self.write("index.html", "<p>hello</p>" * 100)
+        precompress_directory(self.root, self.manifest)
+        self.assertEqual(0, precompress_directory(self.root, self.manifest))
+
+        self.write("index.html", "<p>changed</p>" * 100)
+        mtime = os.stat(page).st_mtime_ns + 10**9
+        os.utime(page, ns=(mtime, mtime))
+        self.assertEqual(1, precompress_directory(self.root, self.manifest))
+
+        os.remove(page)
+        precompress_directory(self.root, self.manifest)
+        self.assertFalse(os.path.exists(page + ".gz"))
+
+    def test_leaves_gz_files_it_did_not_write(self):
+        archive = self.write("data.tar.gz", "archive")
+        self.write("notes.txt", "notes " * 100)
+        static_copy = self.write("notes.txt.gz", "copied from static")
+        self.manifest.assets = [os.path.relpath(static_copy)]
+
+        self.assertEqual(0, precompress_directory(self.root, self.manifest))
+        with open(archive) as file:
+            self.assertEqual("archive", file.read())
+        with open(static_copy) as file:
+            self.assertEqual("copied from static", file.read())
+        self.assertEqual([], self.manifest.compressed)
+
+    def test_builds_without_precompress_remove_earlier_copies(self):
+        site = Site(self.root)
+        self.write(site.template_path, '<link href="/index.css">{{ Content }}')
+        self.write(os.path.join(site.static_path, "index.css"), "body { margin: 0 }\n" * 50)
+        self.write(os.path.join(site.content_path, "index.md"), "# Home\n\n" + "Words about the shire. " * 50)
+
+        def gz_files():
+            return [name for _, _, names in os.walk(site.public_path) for name in names if name.endswith(".gz")]
+
+        build(parse_args(["--no-cache", "--precompress", "--fingerprint", "--search-index"]), site)
+        self.assertTrue(any(name.startswith("index.") and name.endswith(".css.gz") for name in gz_files()))
+
+        manifest = build(parse_args(["--no-cache"]), site)
+        self.assertEqual([], gz_files())
+        self.assertEqual([], manifest.compressed)
+
+
+if __name__ == "__main__":
+    unittest.main()
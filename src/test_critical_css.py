@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+from critical_css import CriticalCSS, critical_css, critical_css_filter
+from manifest import Manifest
+from utilites import sync_directory
+
+
+STYLESHEET = """
+@charset "utf-8";
+/* Page layout */
+body {
+    margin: 0;
+    font-family: "Segoe UI", sans-serif;
+}
+
+a:hover { text-decoration: underline; }
+.note, p { color: red }
+article > p code { padding: 0 }
+table { border: 0 }
+@font-face { font-family: Body; src: url(body.woff2); }
+@media (max-width: 600px) {
+    body { padding: 8px }
+    .wide { display: none }
+}
+@media print {
+    nav { display: none }
+}
+"""
+
+
+class TestCriticalCSS(unittest.TestCase):
+    def test_keeps_rules_for_known_tags(self):
+        css = critical_css(STYLESHEET, {"body", "article", "p", "code", "a"})
+        self.assertEqual(
+            'body{margin:0;font-family:"Segoe UI", sans-serif}'
+            "p{color:red}"
+            "article > p code{padding:0}"
+            "@media (max-width: 600px){body{padding:8px}}",
+            css,
+        )
+
+    def test_filter_inlines_and_defers_stylesheet(self):
+        public = "public"
+        styles = CriticalCSS(public, {"index.css": "body{margin:0}"}, {"index.css": "static/index.css"})
+        chunks = ['<head><link href="/index.css" rel="stylesheet"><link rel="icon" href="/index.css"></head>']
+        dependencies = set()
+        html = "".join(styles(chunks, os.path.join(public, "index.html"), dependencies))
+        self.assertEqual(
+            "<head><style>body{margin:0}</style>"
+            '<link rel="preload" href="/index.css" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+            '<noscript><link rel="stylesheet" href="/index.css"></noscript>'
+            '<link rel="icon" href="/index.css"></head>',
+            html,
+        )
+        self.assertEqual({"static/index.css"}, dependencies)
+
+    def test_analysis_is_cached_by_stylesheet_hash(self):
+        with tempfile.TemporaryDirectory() as root:
+            static = os.path.join(root, "static")
+            public = os.path.join(root, "public")
+            template = os.path.join(root, "template.html")
+            os.makedirs(static)
+            with open(os.path.join(static, "index.css"), "w") as file:
+                file.write("nav { color: red } p { color: blue }")
+            with open(template, "w") as file:
+                file.write("<nav>{{ Content }}</nav>")
+            manifest = Manifest(os.path.join(root, "manifest.json"))
+            sync_directory(static, public, manifest)
+
+            styles = critical_css_filter(static, public, manifest, [template])
+            self.assertEqual({"index.css": "nav{color:red}p{color:blue}"}, styles.styles)
+            key = next(iter(manifest.critical_css))
+            manifest.critical_css[key] = "cached"
+            self.assertEqual("cached", critical_css_filter(static, public, manifest, [template]).styles["index.css"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import unittest
+
+from fingerprint import AssetRewriter, fingerprint_assets, fingerprinted_name, remove_stale_fingerprints
+from manifest import Manifest
+from test_helpers import TempDirMixin
+from utilites import sync_directory
+
+
+class TestFingerprint(TempDirMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.root, "static")
+        self.public = os.path.join(self.root, "public")
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "logo.png"), "png")
+        self.write(os.path.join(self.static, "about.html"), "about")
+        self.manifest = Manifest(os.path.join(self.root, "manifest.json"))
+
+    def fingerprint(self):
+        self.manifest.begin_build()
+        sync_directory(self.static, self.public, self.manifest)
+        return fingerprint_assets(self.static, self.public, self.manifest)
+
+    def test_fingerprinted_name(self):
+        self.assertEqual("css/index.0123abcd.css", fingerprinted_name("css/index.css", "0123abcdef"))
+
+    def test_copies_assets_but_not_pages(self):
+        rewriter = self.fingerprint()
+        self.assertEqual(["images/logo.png", "index.css"], sorted(rewriter.assets))
+        for fingerprinted in rewriter.assets.values():
+            self.assertTrue(os.path.exists(os.path.join(self.public, fingerprinted)))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.css")))
+
+    def test_changed_asset_replaces_old_copy(self):
+        old = self.fingerprint().assets["index.css"]
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        new = self.fingerprint().assets["index.css"]
+        self.assertNotEqual(old, new)
+        self.assertFalse(os.path.exists(os.path.join(self.public, old)))
+
+        remove_stale_fingerprints(self.public, self.manifest)
+        self.assertFalse(os.path.exists(os.path.join(self.public, new)))
+        self.assertEqual({}, self.manifest.fingerprints)
+
+    def test_rewriter(self):
+        rewriter = AssetRewriter(
+            self.public, {"index.css": "index.0123abcd.css", "images/logo.png": "images/logo.4567cdef.png"},
+            {"index.css": "static/index.css", "images/logo.png": "static/images/logo.png"},
+        )
+        chunks = [
+            '<link href="/index.css?v=1">',
+            '<img src="../images/logo.png" alt="logo"></img>',
+            '<a href="https://example.com/index.css">x</a>',
+        ]
+        assets = set()
+        html = "".join(rewriter(chunks, os.path.join(self.public, "blog", "index.html"), assets))
+        self.assertEqual(
+            '<link href="/index.0123abcd.css?v=1">'
+            '<img src="/images/logo.4567cdef.png" alt="logo"></img>'
+            '<a href="https://example.com/index.css">x</a>',
+            html,
+        )
+        self.assertEqual({"static/index.css", "static/images/logo.png"}, assets)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import pickle
+import sqlite3
+import unittest
+
+from fragment_cache import FragmentCache
+from htmlnode import count_nodes
+from markdown_blocks import block_to_html_node, cached_block_to_html_node
+from test_helpers import TempDirMixin
+
+
+class TestFragmentCache(TempDirMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = FragmentCache(os.path.join(self.root, "cache", "fragments.sqlite"), min_block_size=0)
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_get_and_put(self):
+        self.assertIsNone(self.cache.get("block"))
+        self.cache.put("block", "<p>block</p>", 2)
+        self.assertEqual(("<p>block</p>", 2), self.cache.get("block"))
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+
+    def test_cached_render_matches_uncached(self):
+        block = "* a **bold** item\n* and a [link](/x)"
+        expected = block_to_html_node(block)
+        for _ in range(2):
+            cached = cached_block_to_html_node(block, cache=self.cache)
+            self.assertEqual(expected.to_html(), cached.to_html())
+            # Statistics see the same tree whether or not the block came from the cache.
+            self.assertEqual(count_nodes(expected), count_nodes(cached))
+        self.assertEqual(1, self.cache.hits)
+
+    def test_trim_evicts_least_recently_used(self):
+        self.cache.max_bytes = 10
+        for i in range(3):
+            self.cache.put(f"block {i}", "12345", 1)
+        self.cache.get("block 0")
+        self.assertEqual(1, self.cache.trim())
+        self.assertIsNotNone(self.cache.get("block 0"))
+        self.assertIsNone(self.cache.get("block 1"))
+
+    def test_tables_from_older_versions_are_replaced(self):
+        path = os.path.join(self.root, "old.sqlite")
+        connection = sqlite3.connect(path)
+        connection.execute("CREATE TABLE fragments (key TEXT PRIMARY KEY, html TEXT NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)")
+        connection.commit()
+        connection.close()
+
+        cache = FragmentCache(path, min_block_size=0)
+        cache.put("block", "<p>block</p>", 2)
+        self.assertEqual(("<p>block</p>", 2), cache.get("block"))
+        cache.close()
+
+    def test_pickle_drops_connection(self):
+        self.cache.put("block", "<p>block</p>", 2)
+        self.cache.flush()
+        copy = pickle.loads(pickle.dumps(self.cache))
+        self.assertEqual(("<p>block</p>", 2), copy.get("block"))
+        copy.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
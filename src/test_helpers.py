@@ -0,0 +1,19 @@
+import os
+import tempfile
+
+
+class TempDirMixin:
+    # Gives each test a fresh temporary directory, self.root, removed once the test ends.
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+
+    def write(self, path, data):
+        # Relative paths are taken from self.root; bytes are written as they are.
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb" if isinstance(data, bytes) else "w") as file:
+            file.write(data)
+        return path
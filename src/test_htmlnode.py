@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from htmlnode import HTMLNode, LeafNode, ParentNode
@@ -78,6 +79,17 @@ class TestParentNode(unittest.TestCase):
         for expected, result in zip(expectations, results):
             self.assertEqual(expected, result)
 
+    def test_iter_html(self):
+        node = ParentNode("div", [LeafNode("b", "bold"), ParentNode("p", [LeafNode(None, "text")])])
+        self.assertEqual(["<div>", "<b>bold</b>", "<p>", "text", "</p>", "</div>"], list(node.iter_html()))
+
+        writer = io.StringIO()
+        node.render_to(writer)
+        self.assertEqual(node.to_html(), writer.getvalue())
+
+        with self.assertRaises(ValueError):
+            list(ParentNode("div", None).iter_html())
+
 
 if __name__ == "__main__":
     unittest.main()
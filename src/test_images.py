@@ -0,0 +1,100 @@
+import os
+import struct
+import unittest
+from unittest import mock
+
+from images import ImageAttributes, image_attributes, image_size
+from manifest import Manifest, file_hash
+from test_helpers import TempDirMixin
+from utilites import sync_directory
+
+
+PNG = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", 640, 480) + b"\x08\x02\x00\x00\x00"
+GIF = b"GIF89a" + struct.pack("<HH", 32, 16) + b"\x00" * 8
+# SOI, an APP0 segment to skip, then a baseline frame header.
+JPEG = (
+    b"\xff\xd8"
+    + b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    + b"\xff\xc0" + struct.pack(">HBHH", 17, 8, 300, 400) + b"\x00" * 10
+)
+WEBP_LOSSY = b"RIFF\x00\x00\x00\x00WEBPVP8 \x00\x00\x00\x00\x00\x00\x00\x9d\x01\x2a" + struct.pack("<HH", 50, 60)
+WEBP_LOSSLESS = b"RIFF\x00\x00\x00\x00WEBPVP8L\x00\x00\x00\x00\x2f" + struct.pack("<I", (20 - 1) | ((10 - 1) << 14))
+WEBP_EXTENDED = (
+    b"RIFF\x00\x00\x00\x00WEBPVP8X" + b"\x00" * 8 + (999).to_bytes(3, "little") + (499).to_bytes(3, "little")
+)
+
+
+class TestImages(TempDirMixin, unittest.TestCase):
+    def test_image_size(self):
+        cases = [
+            ("a.png", PNG, (640, 480)),
+            ("a.gif", GIF, (32, 16)),
+            ("a.jpg", JPEG, (400, 300)),
+            ("lossy.webp", WEBP_LOSSY, (50, 60)),
+            ("lossless.webp", WEBP_LOSSLESS, (20, 10)),
+            ("extended.webp", WEBP_EXTENDED, (1000, 500)),
+            ("a.txt", b"not an image", None),
+        ]
+        for name, data, size in cases:
+            with self.subTest(name=name):
+                self.assertEqual(size, image_size(self.write(name, data)))
+
+    def test_truncated_headers(self):
+        # A file cut off before the size is complete has no size, rather than a wrong one or an error.
+        for name, data in [("a.png", PNG), ("a.gif", GIF), ("a.jpg", JPEG), ("lossy.webp", WEBP_LOSSY),
+                           ("lossless.webp", WEBP_LOSSLESS), ("extended.webp", WEBP_EXTENDED)]:
+            full_size = image_size(self.write(name, data))
+            for length in range(len(data)):
+                with self.subTest(name=name, length=length):
+                    self.assertIn(image_size(self.write(name, data[:length])), (None, full_size))
+
+    def test_sizes_are_cached_by_hash(self):
+        static = os.path.join(self.root, "static")
+        public = os.path.join(self.root, "public")
+        self.write(os.path.join("static", "images", "logo.png"), PNG)
+        self.write(os.path.join("static", "copy.png"), PNG)
+        manifest = Manifest(os.path.join(self.root, "manifest.json"))
+        sync_directory(static, public, manifest)
+
+        attributes = image_attributes(static, public, manifest)
+        self.assertEqual({"images/logo.png": (640, 480), "copy.png": (640, 480)}, attributes.sizes)
+        self.assertEqual([[640, 480]], [list(size) for size in manifest.image_sizes.values()])
+
+    def test_unreferenced_images_are_not_rehashed(self):
+        static = os.path.join(self.root, "static")
+        public = os.path.join(self.root, "public")
+        self.write(os.path.join("static", "unused.png"), PNG)
+        hashed = []
+        for _ in range(2):
+            manifest = Manifest(os.path.join(self.root, "manifest.json"))
+            manifest.begin_build()
+            sync_directory(static, public, manifest)
+            with mock.patch("manifest.file_hash", wraps=file_hash) as hash_mock:
+                attributes = image_attributes(static, public, manifest)
+            manifest.save()
+            hashed.append(hash_mock.call_count)
+            self.assertEqual({"unused.png": (640, 480)}, attributes.sizes)
+        self.assertEqual([1, 0], hashed)
+
+    def test_filter(self):
+        public = os.path.join(self.root, "public")
+        attributes = ImageAttributes(public, {"images/logo.png": (640, 480)}, {"images/logo.png": "static/logo.png"})
+        chunks = [
+            '<p><img src="../images/logo.png" alt="logo"></img></p>',
+            '<img src="/images/other.png" alt="other"></img>',
+            '<img src="/images/logo.png" width="10"></img>',
+        ]
+        dependencies = set()
+        html = "".join(attributes(chunks, os.path.join(public, "blog", "index.html"), dependencies))
+        self.assertEqual(
+            '<p><img src="../images/logo.png" alt="logo" width="640" height="480" loading="lazy" decoding="async">'
+            "</img></p>"
+            '<img src="/images/other.png" alt="other"></img>'
+            '<img src="/images/logo.png" width="10"></img>',
+            html,
+        )
+        self.assertEqual({"static/logo.png"}, dependencies)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -286,6 +286,51 @@ class TestInlineMarkdown(unittest.TestCase):
         for expected, result in zip(expectations, results):
             self.assertEqual(expected, result)
 
+    def test_text_to_nodes_edge_cases(self):
+        self.assertEqual([], text_to_textnodes(""))
+        self.assertEqual([TextNode("a ", TextType.TEXT)], text_to_textnodes("a ****"))
+
+        # Delimited spans are taken verbatim, so links inside them stay text.
+        self.assertEqual(
+            [TextNode("see [x](/y)", TextType.BOLD)],
+            text_to_textnodes("**see [x](/y)**"),
+        )
+
+        # An image is not mistaken for a link with the same text and URL.
+        self.assertEqual(
+            [
+                TextNode("l", TextType.IMAGE, "/u"),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("l", TextType.LINK, "/u"),
+            ],
+            text_to_textnodes("![l](/u) and [l](/u)"),
+        )
+
+        self.assertEqual(
+            [TextNode("a ! [b] (c) ![d]", TextType.TEXT)],
+            text_to_textnodes("a ! [b] (c) ![d]"),
+        )
+
+        with self.assertRaises(Exception):
+            text_to_textnodes("unclosed `code")
+
+        # Link text never contains "[", so only the innermost bracket opens the link.
+        self.assertEqual(
+            [TextNode("[a ", TextType.TEXT), TextNode("b", TextType.LINK, "/c")],
+            text_to_textnodes("[a [b](/c)"),
+        )
+
+        # A URL left open stops at a delimiter, which is still parsed.
+        self.assertEqual(
+            [
+                TextNode("[a](/b ", TextType.TEXT),
+                TextNode("c", TextType.ITALIC),
+                TextNode(" ", TextType.TEXT),
+                TextNode("d", TextType.LINK, "/e"),
+            ],
+            text_to_textnodes("[a](/b *c* [d](/e)"),
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+
+from links import LinkIndex, block_links, check_links, link_target
+from manifest import Manifest
+from markdown_blocks import BlockType
+from page_generation import generate_pages_recursive
+
+
+class TestLinks(unittest.TestCase):
+    def test_block_links(self):
+        block = "See [home](/) and ![logo](/images/logo.png), not `[code](/nope)`"
+        self.assertEqual(["/", "/images/logo.png"], block_links(block, BlockType.PARAGRAPH))
+        self.assertEqual([], block_links("[code](/nope)", BlockType.CODE))
+
+    def test_link_target(self):
+        self.assertEqual("blog/post", link_target("post#intro", "blog/index.html"))
+        self.assertEqual("images/logo.png", link_target("../images/logo.png", "blog/index.html"))
+        self.assertEqual("images/logo.png", link_target("/images/logo.png", "blog/index.html"))
+        self.assertEqual(".", link_target("/", "blog/index.html"))
+        self.assertIsNone(link_target("https://example.com/", "index.html"))
+        self.assertIsNone(link_target("mailto:someone@example.com", "index.html"))
+        self.assertIsNone(link_target("#top", "index.html"))
+
+    def test_broken(self):
+        index = LinkIndex()
+        index.add("index.md", "index.html", "/blog/")
+        index.add("index.md", "index.html", "/missing")
+        index.add("blog/index.md", "blog/index.html", "../style.css")
+        files = {"index.html", "blog/index.html", "style.css"}
+        self.assertEqual([("index.md", "/missing")], index.broken(files))
+
+    def test_check_links_uses_manifest(self):
+        with tempfile.TemporaryDirectory() as root:
+            content = os.path.join(root, "content")
+            public = os.path.join(root, "public")
+            template = os.path.join(root, "template.html")
+            os.makedirs(os.path.join(content, "blog"))
+            with open(template, "w") as file:
+                file.write("{{ Content }}")
+            with open(os.path.join(content, "index.md"), "w") as file:
+                file.write("# Home\n\n[Blog](/blog) [Gone](/gone.html)")
+            with open(os.path.join(content, "blog", "index.md"), "w") as file:
+                file.write("# Blog\n\n[Home](../)")
+
+            manifest = Manifest(os.path.join(root, "manifest.json"))
+            generate_pages_recursive(content, template, public, manifest)
+            manifest.save()
+
+            # Skipped pages keep the links recorded when they were built.
+            manifest = Manifest(os.path.join(root, "manifest.json"))
+            generate_pages_recursive(content, template, public, manifest)
+            broken = check_links(manifest, public)
+            self.assertEqual([(os.path.relpath(os.path.join(content, "index.md")), "/gone.html")], broken)
+
+
+if __name__ == "__main__":
+    unittest.main()
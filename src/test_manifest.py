@@ -0,0 +1,100 @@
+import json
+import os
+import unittest
+
+from manifest import Manifest
+from page_generation import generate_pages_recursive
+from test_helpers import TempDirMixin
+
+
+class TestManifest(TempDirMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.public = os.path.join(self.root, "public")
+        self.template = os.path.join(self.root, "template.html")
+        self.manifest_path = os.path.join(self.root, "manifest.json")
+        os.makedirs(os.path.join(self.content, "post"))
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "post", "index.md"), "# Post")
+
+    def build(self):
+        manifest = Manifest(self.manifest_path)
+        generate_pages_recursive(self.content, self.template, self.public, manifest)
+        manifest.prune()
+        manifest.save()
+        return manifest
+
+    def test_unchanged_pages_are_skipped(self):
+        self.build()
+        output = os.path.join(self.public, "index.html")
+        mtime = os.stat(output).st_mtime_ns
+        os.utime(output, ns=(mtime - 10**9, mtime - 10**9))
+
+        self.build()
+        self.assertEqual(mtime - 10**9, os.stat(output).st_mtime_ns)
+
+    def test_changed_inputs_are_regenerated(self):
+        self.build()
+        self.write(os.path.join(self.content, "index.md"), "# Changed")
+        self.build()
+        with open(os.path.join(self.public, "index.html")) as file:
+            self.assertEqual("<title>Changed</title><div><h1>Changed</h1></div>", file.read())
+
+        self.write(self.template, "{{ Title }}")
+        self.build()
+        with open(os.path.join(self.public, "post", "index.html")) as file:
+            self.assertEqual("Post", file.read())
+
+    def test_explain_and_dependents(self):
+        self.build()
+        partial = os.path.join(self.root, "_footer.html")
+        self.write(partial, "footer")
+        self.write(self.template, "{{ Title }}{{> _footer.html }}")
+
+        manifest = Manifest(self.manifest_path)
+        post = os.path.join(self.content, "post", "index.md")
+        post_output = os.path.join(self.public, "post", "index.html")
+        self.assertEqual(f"now depends on {os.path.relpath(partial)}", manifest.explain(post, self.template, post_output))
+        generate_pages_recursive(self.content, self.template, self.public, manifest)
+        self.assertEqual(2, len(manifest.reasons))
+        self.assertEqual(
+            sorted([os.path.relpath(post), os.path.relpath(os.path.join(self.content, "index.md"))]),
+            sorted(manifest.dependents(partial)),
+        )
+
+        manifest.begin_build()
+        self.assertIsNone(manifest.explain(post, self.template, post_output))
+        os.remove(post_output)
+        manifest.begin_build()
+        self.assertEqual("output missing", manifest.explain(post, self.template, post_output))
+
+    def test_page_links_are_kept_beside_the_manifest(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[Post](/post/)")
+        manifest = self.build()
+        source = os.path.relpath(os.path.join(self.content, "index.md"))
+        with open(self.manifest_path) as file:
+            self.assertNotIn("links", json.load(file)["pages"][source])
+        self.assertEqual(["/post/"], Manifest(self.manifest_path).page_index()[source]["links"])
+
+        # A build that changes no page leaves the sidecar alone.
+        mtime = os.stat(manifest.page_index_path).st_mtime_ns
+        os.utime(manifest.page_index_path, ns=(mtime - 10**9, mtime - 10**9))
+        self.build()
+        self.assertEqual(mtime - 10**9, os.stat(manifest.page_index_path).st_mtime_ns)
+
+        os.remove(os.path.join(self.content, "index.md"))
+        self.build()
+        self.assertNotIn(source, Manifest(self.manifest_path).page_index())
+
+    def test_removed_sources_are_pruned(self):
+        self.build()
+        os.remove(os.path.join(self.content, "post", "index.md"))
+        manifest = self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "post", "index.html")))
+        self.assertEqual(1, len(manifest.pages))
+
+
+if __name__ == "__main__":
+    unittest.main()
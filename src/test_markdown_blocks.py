@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from markdown_blocks import *
@@ -312,6 +313,41 @@ Some plain text."""
         for expected, result in zip(expectations, results):
             self.assertEqual(expected, result)
 
+    def test_iter_blocks(self):
+        markdown = """
+
+# Heading
+
+
+
+Paragraph line
+  second line  
+
+* one
+* two
+
+1. first
+2. second
+> not a quote
+
+```
+code
+```
+"""
+        blocks = list(iter_blocks(io.StringIO(markdown)))
+        self.assertEqual(markdown_to_blocks(markdown), [block for _, block in blocks])
+        self.assertEqual(
+            [
+                BlockType.HEADING,
+                BlockType.PARAGRAPH,
+                BlockType.UNORDERED_LIST,
+                BlockType.PARAGRAPH,
+                BlockType.CODE,
+            ],
+            [block_type for block_type, _ in blocks],
+        )
+        self.assertEqual([], list(iter_blocks(["\n", "", "\n"])))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+from minify import minify_html
+
+
+PAGE = """<!DOCTYPE html>
+<html>
+  <head>
+    <!-- page metadata -->
+    <meta charset="utf-8" />
+    <link href="/index.css" rel="stylesheet">
+  </head>
+  <body>
+    <p>Some   <b>bold</b>
+      text and <code>a  =  b</code> inline.</p>
+    <pre><code>def f():
+    return  1 < 2
+</code></pre>
+    <img src="/a b.png" alt="">
+  </body>
+</html>
+"""
+
+MINIFIED = (
+    "<!DOCTYPE html><html><head>"
+    '<meta charset=utf-8 /><link href=/index.css rel=stylesheet>'
+    "</head><body>"
+    "<p>Some <b>bold</b> text and <code>a  =  b</code> inline.</p>"
+    "<pre><code>def f():\n    return  1 < 2\n</code></pre>"
+    '<img src="/a b.png" alt="">'
+    "</body></html>"
+)
+
+
+class TestMinify(unittest.TestCase):
+    def test_minify(self):
+        self.assertEqual(MINIFIED, "".join(minify_html([PAGE])))
+
+    def test_chunk_boundaries_do_not_matter(self):
+        # Split everywhere, including inside tags, comments and the closing </pre>.
+        self.assertEqual(MINIFIED, "".join(minify_html(list(PAGE))))
+        for size in (2, 3, 7, 16):
+            chunks = [PAGE[i:i + size] for i in range(0, len(PAGE), size)]
+            self.assertEqual(MINIFIED, "".join(minify_html(chunks)))
+
+    def test_text_with_angle_brackets(self):
+        self.assertEqual("<p>1 < 2 and 3 > 2</p>", "".join(minify_html(["<p>1 <  2 and 3 > 2</p>"])))
+
+    def test_conditional_comments_are_kept(self):
+        html = "<head><!--[if IE]><p>old</p><![endif]--></head>"
+        self.assertEqual(html, "".join(minify_html([html])))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import hashlib
+import io
+import os
+import unittest
+
+import profiling
+from page_generation import collect_pages, generate_page, generate_pages, parse_page
+from test_helpers import TempDirMixin
+
+
+class TestPageGeneration(TempDirMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.public = os.path.join(self.root, "public")
+        self.template = os.path.join(self.root, "template.html")
+        with open(self.template, "w") as file:
+            file.write("{{ Title }}|{{ Content }}")
+        for i in range(6):
+            page_dir = os.path.join(self.content, f"page{i}")
+            os.makedirs(page_dir)
+            with open(os.path.join(page_dir, "index.md"), "w") as file:
+                file.write(f"# Page {i}\n\nBody *{i}*")
+
+    def test_collect_pages(self):
+        pages = collect_pages(self.content, self.template, self.public)
+        self.assertEqual(6, len(pages))
+        self.assertEqual(
+            (
+                os.path.join(self.content, "page0", "index.md"),
+                self.template,
+                os.path.join(self.public, "page0", "index.html"),
+            ),
+            pages[0],
+        )
+
+    def test_parallel_matches_serial(self):
+        pages = collect_pages(self.content, self.template, self.public)
+        serial_hashes = [stats["output_hash"] for stats in generate_pages(pages, jobs=1)]
+        parallel_hashes = [stats["output_hash"] for stats in generate_pages(pages, jobs=3)]
+        self.assertEqual(serial_hashes, parallel_hashes)
+
+        with open(os.path.join(self.public, "page3", "index.html")) as file:
+            self.assertEqual("Page 3|<div><h1>Page 3</h1><p>Body <i>3</i></p></div>", file.read())
+
+    def test_output_hash_matches_file(self):
+        source = os.path.join(self.content, "page0", "index.md")
+        with open(source, "w") as file:
+            file.write("# Café\n\nNaïve ünïcode")
+        dest = os.path.join(self.public, "page0", "index.html")
+        for profile in (False, True):
+            with self.subTest(profile=profile):
+                if profile:
+                    profiling.enable()
+                    self.addCleanup(profiling.disable)
+                stats = generate_page(source, self.template, dest)
+                with open(dest, "rb") as file:
+                    output = file.read()
+                self.assertEqual(hashlib.sha256(output).hexdigest(), stats["output_hash"])
+                self.assertEqual(len(output), stats["output_bytes"])
+
+    def test_parse_page_streams_blocks(self):
+        source = io.StringIO("Intro\n\n  # Title  \n\n* [a](/a)\n* b\n")
+        links = []
+        title, content = parse_page(source, links=links)
+        self.assertEqual("Title", title)
+        self.assertEqual((0, []), (content.blocks, links))
+
+        html = content.to_html()
+        self.assertEqual(
+            '<div><p>Intro</p><h1>Title</h1><ul><li><a href="/a">a</a></li><li>b</li></ul></div>', html
+        )
+        self.assertEqual(3, content.blocks)
+        self.assertEqual(10, content.nodes)
+        self.assertEqual(["/a"], links)
+
+    def test_page_without_title_writes_nothing(self):
+        source = os.path.join(self.content, "page0", "index.md")
+        with open(source, "w") as file:
+            file.write("No title\n\n## Only a subheading")
+        dest = os.path.join(self.public, "page0", "index.html")
+        with self.assertRaisesRegex(Exception, "No h1 header"):
+            generate_page(source, self.template, dest)
+        self.assertFalse(os.path.exists(dest))
+
+    def test_failed_render_keeps_previous_page(self):
+        source = os.path.join(self.content, "page0", "index.md")
+        dest = os.path.join(self.public, "page0", "index.html")
+        generate_page(source, self.template, dest)
+        with open(dest) as file:
+            previous = file.read()
+
+        self.write(source, "# Good\n\nEdited paragraph.\n\nBroken **bold")
+        with self.assertRaisesRegex(Exception, "Invalid Markdown syntax"):
+            generate_page(source, self.template, dest)
+        with open(dest) as file:
+            self.assertEqual(previous, file.read())
+        self.assertEqual(["index.html"], os.listdir(os.path.dirname(dest)))
+
+    def test_errors_name_the_page(self):
+        bad_path = os.path.join(self.content, "page5", "index.md")
+        with open(bad_path, "w") as file:
+            file.write("no title")
+        pages = collect_pages(self.content, self.template, self.public)
+        with self.assertRaisesRegex(Exception, "page5"):
+            list(generate_pages(pages, jobs=2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import contextlib
+import io
+import os
+import unittest
+
+from main import parse_args
+from page_generation import collect_pages, generate_pages
+from pipeline import generate_pages_pipelined
+from test_helpers import TempDirMixin
+
+
+class TestPipeline(TempDirMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        with open(self.template, "w") as file:
+            file.write("{{ Title }}|{{ Content }}")
+        for i in range(10):
+            page_dir = os.path.join(self.content, f"page{i}")
+            os.makedirs(page_dir)
+            with open(os.path.join(page_dir, "index.md"), "w") as file:
+                file.write(f"# Page {i}\n\n* item **{i}**\n* [link](/page{i})\n")
+
+    def test_matches_serial_generation(self):
+        serial = list(generate_pages(collect_pages(self.content, self.template, os.path.join(self.root, "a"))))
+        pipelined = list(generate_pages_pipelined(
+            collect_pages(self.content, self.template, os.path.join(self.root, "b")), io_threads=3, depth=2
+        ))
+
+        self.assertEqual([stats["output_hash"] for stats in serial], [stats["output_hash"] for stats in pipelined])
+        for key in ("source_bytes", "output_bytes", "blocks", "nodes"):
+            self.assertEqual([stats[key] for stats in serial], [stats[key] for stats in pipelined])
+        with open(os.path.join(self.root, "b", "page7", "index.html")) as file:
+            self.assertTrue(file.read().startswith("Page 7|<div><h1>Page 7</h1><ul>"))
+
+    def test_errors_name_the_page(self):
+        with open(os.path.join(self.content, "page4", "index.md"), "w") as file:
+            file.write("no title")
+        pages = collect_pages(self.content, self.template, os.path.join(self.root, "public"))
+        with self.assertRaisesRegex(Exception, "page4"):
+            list(generate_pages_pipelined(pages, depth=2))
+
+    def test_pipeline_rejects_jobs(self):
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            parse_args(["--pipeline", "--jobs", "2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
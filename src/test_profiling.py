@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+import unittest
+
+import profiling
+from page_generation import generate_page, generate_pages
+
+
+class TestProfiling(unittest.TestCase):
+    def tearDown(self):
+        profiling.disable()
+
+    def test_disabled_spans_record_nothing(self):
+        with profiling.span("read"):
+            pass
+        self.assertFalse(profiling.is_enabled())
+        self.assertEqual([], profiling.drain())
+
+    def test_spans_become_trace_events(self):
+        profiling.enable()
+        with profiling.span("page", path="index.md"):
+            with profiling.span("render"):
+                pass
+
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "trace.json")
+            profiling.write_trace(path)
+            with open(path) as file:
+                events = json.load(file)["traceEvents"]
+
+        self.assertEqual(["render", "page"], [event["name"] for event in events])
+        self.assertEqual({"path": "index.md"}, events[1]["args"])
+        self.assertEqual("X", events[0]["ph"])
+        self.assertLessEqual(events[1]["ts"], events[0]["ts"])
+
+    def test_drain_hands_over_events(self):
+        profiling.enable()
+        with profiling.span("write"):
+            pass
+        events = profiling.drain()
+        self.assertEqual(1, len(events))
+        self.assertEqual([], profiling.drain())
+        profiling.add_events(events)
+        self.assertEqual(events, profiling.drain())
+
+    def test_worker_processes_do_not_resend_parent_events(self):
+        profiling.enable()
+        with profiling.span("copy static"):
+            pass
+        with tempfile.TemporaryDirectory() as root:
+            template = os.path.join(root, "template.html")
+            with open(template, "w") as file:
+                file.write("{{ Title }}|{{ Content }}")
+            pages = []
+            for i in range(4):
+                source = os.path.join(root, f"page{i}.md")
+                with open(source, "w") as file:
+                    file.write(f"# Page {i}")
+                pages.append((source, template, os.path.join(root, "public", f"page{i}.html")))
+            list(generate_pages(pages, jobs=2))
+
+        names = [event["name"] for event in profiling.drain()]
+        self.assertEqual(1, names.count("copy static"))
+        self.assertEqual(4, names.count("page"))
+
+    def test_page_spans(self):
+        with tempfile.TemporaryDirectory() as root:
+            template = os.path.join(root, "template.html")
+            with open(template, "w") as file:
+                file.write("{{ Title }}|{{ Content }}")
+            source = os.path.join(root, "page.md")
+            with open(source, "w") as file:
+                file.write("# Page\n\nSome *text*")
+            dest = os.path.join(root, "page.html")
+            generate_page(source, template, dest)
+            with open(dest) as file:
+                expected = file.read()
+
+            profiling.enable()
+            generate_page(source, template, dest)
+            with open(dest) as file:
+                self.assertEqual(expected, file.read())
+
+        names = [event["name"] for event in profiling.drain()]
+        self.assertEqual({"scan title", "render", "block split", "inline parse"}, set(names))
+        self.assertEqual(3, names.count("block split"))
+        self.assertEqual(2, names.count("inline parse"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import json
+import os
+import unittest
+
+from manifest import Manifest
+from markdown_blocks import BlockType
+from page_generation import generate_pages_recursive
+from search_index import block_terms, remove_search_index, shard_name, write_search_index
+from test_helpers import TempDirMixin
+
+
+class TestSearchIndex(TempDirMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.public = os.path.join(self.root, "public")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(os.path.join(self.content, "rings"))
+        self.write(self.template, "{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome to the shire.")
+        self.write(os.path.join(self.content, "rings", "index.md"), "# Rings\n\nThe shire and the rings.")
+        self.manifest = Manifest(os.path.join(self.root, "manifest.json"))
+
+    def read_index(self, name):
+        with open(os.path.join(self.public, "search", name), "r") as file:
+            return json.load(file)
+
+    def build(self):
+        self.manifest.begin_build()
+        generate_pages_recursive(self.content, self.template, self.public, self.manifest, index_search=True)
+        self.manifest.prune()
+        return write_search_index(self.manifest, self.public)
+
+    def test_block_terms(self):
+        terms = {}
+        block_terms("# The Shire", BlockType.HEADING, terms)
+        block_terms("The [shire](/shire-map) is a place.", BlockType.PARAGRAPH, terms)
+        block_terms("shire = 1", BlockType.CODE, terms)
+        self.assertEqual({"the": 9, "shire": 9, "is": 1, "place": 1}, terms)
+
+    def test_shard_name(self):
+        self.assertEqual("sh", shard_name("shire"))
+        self.assertEqual("_c3a974", shard_name("été"))
+
+    def test_index(self):
+        self.build()
+        self.assertEqual({"pages": [["/", "Home"], ["/rings/", "Rings"]]}, self.read_index("pages.json"))
+        self.assertEqual({"shire": [[0, 1], [1, 1]]}, self.read_index("sh.json"))
+        self.assertEqual({"rings": [[1, 9]]}, self.read_index("ri.json"))
+
+    def test_incremental_update(self):
+        self.build()
+        self.write(os.path.join(self.content, "rings", "index.md"), "# Rings\n\nThe shire and the rings. Elves.")
+        # Only the new term's shard changes; page ids stay put.
+        self.assertEqual(1, self.build())
+        self.assertEqual({"elves": [[1, 1]]}, self.read_index("el.json"))
+
+        os.remove(os.path.join(self.content, "index.md"))
+        self.build()
+        self.assertEqual({"pages": [None, ["/rings/", "Rings"]]}, self.read_index("pages.json"))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "search", "we.json")))
+
+        remove_search_index(self.public, self.manifest)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "search")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,291 @@
+import gzip
+import http.client
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from unittest import mock
+
+# server.py is a standalone script at the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http.server import HTTPServer
+
+from compression import compress_file
+from server import (
+    IMMUTABLE_CACHE_CONTROL,
+    LIVE_RELOAD_PATH,
+    LIVE_RELOAD_SCRIPT,
+    CacheEntry,
+    CORSHTTPRequestHandler,
+    FileCache,
+    FingerprintMap,
+    LiveReload,
+    ThreadPoolHTTPServer,
+)
+from test_helpers import TempDirMixin
+
+
+class QuietHandler(CORSHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class TestThreadPoolHTTPServer(TempDirMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("index.html", "<p>Home</p>")
+        handler_class = partial(QuietHandler, directory=self.root)
+        self.server = ThreadPoolHTTPServer(("127.0.0.1", 0), handler_class, workers=2)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def connect(self):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        self.addCleanup(connection.close)
+        return connection
+
+    def get(self, connection, path="/"):
+        connection.request("GET", path)
+        response = connection.getresponse()
+        return response.status, response.read()
+
+    def test_idle_keep_alive_connections_do_not_hold_workers(self):
+        idle = []
+        for _ in range(4):
+            connection = self.connect()
+            self.assertEqual((200, b"<p>Home</p>"), self.get(connection))
+            idle.append(connection)
+        # Connected but never sent a request.
+        silent = socket.create_connection(("127.0.0.1", self.port))
+        self.addCleanup(silent.close)
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: self.get(self.connect()), range(8)))
+        self.assertEqual([(200, b"<p>Home</p>")] * 8, results)
+        self.assertLess(time.monotonic() - start, 2)
+
+        # The idle connections are still usable.
+        for connection in idle:
+            self.assertEqual((200, b"<p>Home</p>"), self.get(connection))
+
+    def test_pipelined_requests(self):
+        with socket.create_connection(("127.0.0.1", self.port), timeout=5) as client:
+            client.sendall(b"GET / HTTP/1.1\r\nHost: x\r\n\r\n" * 2)
+            data = b""
+            while data.count(b"<p>Home</p>") < 2:
+                chunk = client.recv(65536)
+                self.assertTrue(chunk)
+                data += chunk
+        self.assertEqual(2, data.count(b"HTTP/1.1 200"))
+
+    def test_close_ends_requests_in_progress(self):
+        with socket.create_connection(("127.0.0.1", self.port), timeout=5) as client:
+            # A request that never finishes keeps its worker reading.
+            client.sendall(b"GET / HTTP/1.1\r\n")
+            deadline = time.monotonic() + 5
+            while not self.server.active and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertTrue(self.server.active)
+
+            start = time.monotonic()
+            self.server.shutdown()
+            self.server.server_close()
+            self.server.executor.shutdown(wait=True)
+            self.assertLess(time.monotonic() - start, 2)
+
+    def test_idle_connections_are_closed_after_timeout(self):
+        self.server.idle_timeout = 0.2
+        with socket.create_connection(("127.0.0.1", self.port), timeout=5) as client:
+            self.assertEqual(b"", client.recv(1))
+
+
+class TestHandler(TempDirMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.public = os.path.join(self.root, "public")
+        os.makedirs(self.public)
+        self.manifest_path = os.path.join(self.root, ".build_manifest.json")
+        self.servers = []
+
+    def write(self, name, data):
+        return super().write(os.path.join(self.public, name), data)
+
+    def serve(self, server_class=HTTPServer, **attributes):
+        handler_class = partial(type("TestHandler", (QuietHandler,), attributes), directory=self.public)
+        server = server_class(("127.0.0.1", 0), handler_class)
+        self.servers.append(server)
+        thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server.server_address[1]
+
+    def get(self, port, path, headers=None):
+        # One request per connection, so each response is read on its own.
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        try:
+            connection.request("GET", path, headers=headers or {})
+            response = connection.getresponse()
+            return response, response.read()
+        finally:
+            connection.close()
+
+    def test_only_fingerprinted_assets_are_immutable(self):
+        self.write("index.0123abcd.css", b"body {}")
+        self.write("report.20241231.txt", b"report")
+        with open(self.manifest_path, "w") as file:
+            json.dump({"fingerprints": {"index.css": "index.0123abcd.css"}}, file)
+
+        for file_cache in (None, FileCache()):
+            with self.subTest(file_cache=file_cache is not None):
+                port = self.serve(fingerprints=FingerprintMap(self.manifest_path), file_cache=file_cache)
+                for _ in range(2):
+                    response, _ = self.get(port, "/index.0123abcd.css")
+                    self.assertEqual(IMMUTABLE_CACHE_CONTROL, response.getheader("Cache-Control"))
+                    response, _ = self.get(port, "/report.20241231.txt")
+                    self.assertIsNone(response.getheader("Cache-Control"))
+
+        os.remove(os.path.join(self.public, "index.0123abcd.css"))
+        port = self.serve(fingerprints=FingerprintMap(self.manifest_path))
+        response, _ = self.get(port, "/index.0123abcd.css")
+        self.assertEqual(404, response.status)
+        self.assertIsNone(response.getheader("Cache-Control"))
+
+    def test_single_threaded_server_closes_after_each_response(self):
+        self.write("page.html", b"<p>page</p>")
+        port = self.serve()
+        idle = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        self.addCleanup(idle.close)
+        idle.request("GET", "/page.html")
+        response = idle.getresponse()
+        self.assertEqual((10, b"<p>page</p>"), (response.version, response.read()))
+
+        # The first client is still connected but does not hold the server's thread.
+        start = time.monotonic()
+        self.assertEqual(b"<p>page</p>", self.get(port, "/page.html")[1])
+        self.assertLess(time.monotonic() - start, 2)
+
+    def test_cache_revalidates_changed_files(self):
+        path = self.write("page.html", b"<p>old</p>")
+        port = self.serve(file_cache=FileCache(revalidate_after=0))
+        self.assertEqual(b"<p>old</p>", self.get(port, "/page.html")[1])
+
+        self.write("page.html", b"<p>new</p>")
+        mtime = os.stat(path).st_mtime_ns + 10**9
+        os.utime(path, ns=(mtime, mtime))
+        self.assertEqual(b"<p>new</p>", self.get(port, "/page.html")[1])
+
+        os.remove(path)
+        self.assertEqual(404, self.get(port, "/page.html")[0].status)
+
+    def test_precompressed_variants(self):
+        text = b"<p>hello</p>" * 100
+        path = self.write("index.html", text)
+        compress_file(path)
+        for file_cache in (None, FileCache()):
+            with self.subTest(file_cache=file_cache is not None):
+                port = self.serve(file_cache=file_cache)
+                # The cache keys on Accept-Encoding, so each variant stays with its own clients.
+                for _ in range(2):
+                    response, body = self.get(port, "/index.html", {"Accept-Encoding": "gzip"})
+                    self.assertEqual("gzip", response.getheader("Content-Encoding"))
+                    self.assertEqual("Accept-Encoding", response.getheader("Vary"))
+                    self.assertEqual(text, gzip.decompress(body))
+
+                    response, body = self.get(port, "/index.html", {"Accept-Encoding": "gzip;q=0"})
+                    self.assertIsNone(response.getheader("Content-Encoding"))
+                    self.assertEqual("Accept-Encoding", response.getheader("Vary"))
+                    self.assertEqual(text, body)
+
+        # Files without a .gz copy do not vary.
+        self.write("plain.txt", b"plain")
+        response, _ = self.get(port, "/plain.txt", {"Accept-Encoding": "gzip"})
+        self.assertIsNone(response.getheader("Vary"))
+
+    def test_not_modified(self):
+        self.write("index.html", b"<p>Home</p>")
+        for file_cache in (None, FileCache()):
+            with self.subTest(file_cache=file_cache is not None):
+                port = self.serve(file_cache=file_cache)
+                response, _ = self.get(port, "/")
+                last_modified = response.getheader("Last-Modified")
+                response, body = self.get(port, "/", {"If-Modified-Since": last_modified})
+                self.assertEqual((304, b""), (response.status, body))
+
+    def test_large_files_are_sent_with_sendfile(self):
+        data = os.urandom(2 * 1024 * 1024)
+        self.write("large.bin", data)
+        port = self.serve(file_cache=FileCache(max_file_size=1024))
+        with mock.patch.object(socket.socket, "sendfile", autospec=True, side_effect=socket.socket.sendfile) as sendfile:
+            response, body = self.get(port, "/large.bin")
+        self.assertEqual(data, body)
+        self.assertEqual(1, sendfile.call_count)
+
+    def test_live_reload_script_is_injected(self):
+        self.write("index.html", b"<html><body><p>Home</p></body></html>")
+        self.write("bare.html", b"<p>Bare</p>")
+        port = self.serve(live_reload=LiveReload())
+
+        response, body = self.get(port, "/")
+        self.assertEqual(b"<html><body><p>Home</p>" + LIVE_RELOAD_SCRIPT + b"</body></html>", body)
+        self.assertEqual("no-cache", response.getheader("Cache-Control"))
+        self.assertEqual(b"<p>Bare</p>" + LIVE_RELOAD_SCRIPT, self.get(port, "/bare.html")[1])
+
+    def test_live_reload_events(self):
+        live_reload = LiveReload()
+        port = self.serve(partial(ThreadPoolHTTPServer, live_reload=live_reload), live_reload=live_reload)
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        self.addCleanup(connection.close)
+        connection.request("GET", LIVE_RELOAD_PATH)
+        response = connection.getresponse()
+        self.assertEqual("text/event-stream", response.getheader("Content-Type"))
+
+        # The handler has started waiting once its headers are out.
+        live_reload.notify()
+        self.assertEqual(b"data: reload\n", response.fp.readline())
+        self.assertEqual(b"\n", response.fp.readline())
+
+        # Closing the server ends the stream instead of leaving it to hold a worker.
+        start = time.monotonic()
+        self.servers[-1].shutdown()
+        self.servers[-1].server_close()
+        self.assertEqual(b"", response.fp.readline())
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertTrue(live_reload.closed)
+
+
+class TestFileCache(unittest.TestCase):
+    def entry(self, size):
+        return CacheEntry(b"x" * size, "text/plain", None, False, "", False, {})
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = FileCache(max_bytes=10)
+        for key in "abc":
+            cache.put(key, self.entry(4))
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("b"))
+
+        cache.put("d", self.entry(4))
+        self.assertIsNone(cache.get("c"))
+        self.assertIsNotNone(cache.get("b"))
+        self.assertEqual(8, cache.size)
+
+    def test_large_entries_are_not_cached(self):
+        cache = FileCache(max_file_size=4)
+        cache.put("a", self.entry(5))
+        self.assertIsNone(cache.get("a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
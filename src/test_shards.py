@@ -0,0 +1,85 @@
+import os
+import unittest
+
+from main import Site, build, merge, parse_args, shard_path
+from shards import in_shard, parse_shard
+from test_helpers import TempDirMixin
+
+
+class TestShards(TempDirMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.site = Site(self.root)
+        os.makedirs(self.site.static_path)
+        self.write(self.site.template_path, "{{ Title }}|{{ Content }}")
+        self.write(os.path.join(self.site.static_path, "index.css"), "body {}")
+        self.sources = []
+        for i in range(8):
+            source = os.path.join(self.site.content_path, f"post{i}", "index.md")
+            os.makedirs(os.path.dirname(source))
+            self.write(source, f"# Post {i}\n\n[Next](/post{(i + 1) % 8}/)")
+            self.sources.append(source)
+
+    def build_shards(self, count, *flags):
+        args = parse_args(["--no-cache", *flags])
+        for index in range(1, count + 1):
+            build(args, Site(self.root, (index, count)))
+        return [shard_path(self.root, (index, count)) for index in range(1, count + 1)]
+
+    def test_parse_shard(self):
+        self.assertEqual((2, 4), parse_shard("2/4"))
+        for text in ("0/4", "5/4", "1/0", "a/b", "3"):
+            with self.assertRaises(Exception):
+                parse_shard(text)
+
+    def test_shards_are_disjoint_and_complete(self):
+        shards = [(index, 3) for index in range(1, 4)]
+        for source in self.sources:
+            owners = [shard for shard in shards if in_shard(source, self.site.content_path, shard)]
+            self.assertEqual(1, len(owners))
+
+    def test_merge(self):
+        shard_paths = self.build_shards(3, "--search-index")
+        args = parse_args(["--no-cache", "--strict-links", "--merge", *shard_paths])
+        manifest = merge(args, self.site)
+
+        self.assertEqual(8, len(manifest.pages))
+        for i in range(8):
+            with open(os.path.join(self.site.public_path, f"post{i}", "index.html")) as file:
+                self.assertTrue(file.read().startswith(f"Post {i}|"))
+        self.assertTrue(os.path.exists(os.path.join(self.site.public_path, "index.css")))
+        self.assertTrue(os.path.exists(os.path.join(self.site.public_path, "search", "po.json")))
+
+        # The merged manifest lets a normal build skip every page.
+        manifest = build(parse_args(["--no-cache", "--search-index"]), self.site)
+        self.assertEqual({}, manifest.reasons)
+
+    def test_merge_rejects_incomplete_or_mixed_shard_sets(self):
+        halves = self.build_shards(2)
+        thirds = self.build_shards(3)
+        cases = [
+            ([halves[0], halves[0]], "given twice"),
+            ([halves[0]], "Missing shards 2/2"),
+            ([halves[0], thirds[1]], "different sizes"),
+            ([halves[0], self.root], "does not hold a shard build"),
+        ]
+        for shard_paths, message in cases:
+            with self.subTest(message=message):
+                with self.assertRaisesRegex(Exception, message):
+                    merge(parse_args(["--no-cache", "--merge", *shard_paths]), self.site)
+
+    def test_merge_rejects_differing_static_files(self):
+        build(parse_args(["--no-cache"]), self.site)
+        index_path = os.path.join(self.site.public_path, "post0", "index.html")
+        shard_paths = self.build_shards(2)
+        self.write(os.path.join(shard_paths[1], "public", "index.css"), "body { margin: 0 }")
+        args = parse_args(["--no-cache", "--merge", *shard_paths])
+        with self.assertRaisesRegex(Exception, "disagree"):
+            merge(args, self.site)
+        # The failed merge leaves the existing site untouched.
+        self.assertTrue(os.path.exists(index_path))
+        self.assertFalse(os.path.exists(self.site.public_path + ".merging"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from templates import compile_template, find_layout, load_template
+from test_helpers import TempDirMixin
+
+
+class TestTemplates(TempDirMixin, unittest.TestCase):
+    def test_render(self):
+        path = self.write("template.html", "<title> {{ Title }} </title><p>{{Content}}</p>{{ Missing }}")
+        template = compile_template(path)
+        self.assertEqual(["<title> ", "Title", " </title><p>", "Content", "</p>", "Missing", ""], template.segments)
+        self.assertEqual(
+            "<title> Hi </title><p>{{ Title }}</p>",
+            template.render({"Title": "Hi", "Content": "{{ Title }}"}),
+        )
+
+    def test_iter_render_streams_nodes(self):
+        path = self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        node = ParentNode("p", [LeafNode("b", "hi")])
+        chunks = list(compile_template(path).iter_render({"Title": "T", "Content": node}))
+        self.assertEqual(["<title>", "T", "</title>", "<p>", "<b>hi</b>", "</p>", ""], chunks)
+
+    def test_partials(self):
+        self.write("_header.html", "<h1>{{ Title }}</h1>")
+        path = self.write("template.html", "{{> _header.html }}<main>{{ Content }}</main>")
+        template = compile_template(path)
+        self.assertEqual("<h1>T</h1><main>C</main>", template.render({"Title": "T", "Content": "C"}))
+        self.assertEqual(2, len(template.dependencies))
+
+        path = self.write("loop.html", "{{> loop.html }}")
+        with self.assertRaises(Exception):
+            compile_template(path)
+
+    def test_cache_is_invalidated_on_change(self):
+        path = self.write("template.html", "one")
+        template = load_template(path)
+        self.assertIs(template, load_template(path))
+
+        self.write("template.html", "two")
+        mtime = os.stat(path).st_mtime_ns + 10**9
+        os.utime(path, ns=(mtime, mtime))
+        self.assertEqual("two", load_template(path).render({}))
+
+    def test_find_layout(self):
+        self.assertEqual("template.html", find_layout(self.root, "template.html"))
+        layout = self.write("_layout.html", "{{ Content }}")
+        self.assertEqual(layout, find_layout(self.root, "template.html"))
+
+
+if __name__ == "__main__":
+    unittest.main()
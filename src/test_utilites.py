@@ -0,0 +1,46 @@
+import os
+import unittest
+
+from manifest import Manifest
+from test_helpers import TempDirMixin
+from utilites import sync_directory
+
+
+class TestSyncDirectory(TempDirMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.root, "static")
+        self.public = os.path.join(self.root, "public")
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "a.png"), "png")
+        self.manifest = Manifest(os.path.join(self.root, "manifest.json"))
+
+    def test_only_changed_files_are_copied(self):
+        sync_directory(self.static, self.public, self.manifest)
+        self.assertEqual(2, len(self.manifest.assets))
+
+        dest_css = os.path.join(self.public, "index.css")
+        ctime = os.stat(dest_css).st_ctime_ns
+        sync_directory(self.static, self.public, self.manifest)
+        sync_directory(self.static, self.public, self.manifest, use_hash=True)
+        self.assertEqual(ctime, os.stat(dest_css).st_ctime_ns)
+
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        sync_directory(self.static, self.public, self.manifest)
+        with open(dest_css) as file:
+            self.assertEqual("body { margin: 0 }", file.read())
+
+    def test_removed_assets_are_deleted_and_pages_kept(self):
+        sync_directory(self.static, self.public, self.manifest)
+        page = os.path.join(self.public, "index.html")
+        self.write(page, "<html></html>")
+
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        sync_directory(self.static, self.public, self.manifest)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images", "a.png")))
+        self.assertTrue(os.path.exists(page))
+
+
+if __name__ == "__main__":
+    unittest.main()
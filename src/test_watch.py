@@ -0,0 +1,120 @@
+import os
+import threading
+import unittest
+
+from main import Site, build, parse_args
+from test_helpers import TempDirMixin
+from watch import Watcher, rebuild, watch
+
+
+class TestWatch(TempDirMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.site = Site(self.root)
+        os.makedirs(os.path.join(self.site.content_path, "post"))
+        os.makedirs(self.site.static_path)
+        self.write(self.site.template_path, "{{ Title }}|{{ Content }}")
+        self.write(os.path.join(self.site.content_path, "index.md"), "# Home")
+        self.write(os.path.join(self.site.content_path, "post", "index.md"), "# Post")
+        self.write(os.path.join(self.site.static_path, "index.css"), "body {}")
+        self.args = parse_args(["--no-cache"])
+
+    def write(self, path, text):
+        super().write(path, text)
+        mtime = os.stat(path).st_mtime_ns + 10**9
+        os.utime(path, ns=(mtime, mtime))
+
+    def read(self, *parts):
+        with open(os.path.join(self.site.public_path, *parts)) as file:
+            return file.read()
+
+    def test_poll(self):
+        watcher = Watcher([self.site.content_path, self.site.template_path])
+        self.assertEqual(([], []), watcher.poll())
+
+        index = os.path.join(self.site.content_path, "index.md")
+        self.write(index, "# Changed")
+        os.remove(os.path.join(self.site.content_path, "post", "index.md"))
+        self.assertEqual(([index], [os.path.join(self.site.content_path, "post", "index.md")]), watcher.poll())
+
+    def test_poll_spreads_file_checks_over_polls(self):
+        pages = [os.path.join(self.site.content_path, "many", f"page{i}.md") for i in range(10)]
+        for page in pages:
+            self.write(page, "# Page")
+        watcher = Watcher([self.site.content_path], batch_size=3)
+        # 3 directories and 12 files, 3 of them checked per poll.
+        self.assertEqual(15, len(watcher.directories) + len(watcher.snapshot))
+
+        self.write(pages[7], "# Edited")
+        for polls in range(1, 6):
+            changed, _ = watcher.poll()
+            if changed:
+                break
+        self.assertEqual([pages[7]], changed)
+
+        # Recently changed files are checked on every poll, as are new pages at the top.
+        self.write(pages[7], "# Edited again")
+        self.assertEqual(([pages[7]], []), watcher.poll())
+        new_page = os.path.join(self.site.content_path, "new", "index.md")
+        self.write(new_page, "# New")
+        self.assertEqual(([new_page], []), watcher.poll())
+
+        os.remove(pages[0])
+        for polls in range(1, 7):
+            _, removed = watcher.poll()
+            if removed:
+                break
+        self.assertEqual([pages[0]], removed)
+
+    def test_rebuild_only_changed_pages(self):
+        manifest = build(self.args, self.site)
+        index = os.path.join(self.site.content_path, "index.md")
+        post = os.path.join(self.site.content_path, "post", "index.md")
+        self.write(index, "# Changed")
+        os.remove(post)
+
+        full_build = rebuild(self.args, self.site, manifest, None, [index], [post])
+        self.assertFalse(full_build)
+        self.assertEqual("Changed|<div><h1>Changed</h1></div>", self.read("index.html"))
+        self.assertFalse(os.path.exists(os.path.join(self.site.public_path, "post", "index.html")))
+
+    def test_template_change_rebuilds_dependents(self):
+        manifest = build(self.args, self.site)
+        self.write(self.site.template_path, "{{ Title }}")
+
+        full_build = rebuild(self.args, self.site, manifest, None, [self.site.template_path], [])
+        self.assertFalse(full_build)
+        self.assertEqual("Post", self.read("post", "index.html"))
+        self.assertEqual("Home", self.read("index.html"))
+
+    def test_new_layout_triggers_full_build(self):
+        manifest = build(self.args, self.site)
+        layout = os.path.join(self.site.content_path, "post", "_layout.html")
+        self.write(layout, "layout {{ Title }}")
+
+        full_build = rebuild(self.args, self.site, manifest, None, [layout], [])
+        self.assertTrue(full_build)
+        self.assertEqual("layout Post", self.read("post", "index.html"))
+        self.assertEqual(["content/post/index.md"], [os.path.relpath(p, self.root) for p in manifest.dependents(layout)])
+
+    def test_watch_recovers_from_a_failed_first_build(self):
+        os.remove(self.site.template_path)
+        rebuilt = threading.Event()
+
+        def on_rebuild():
+            rebuilt.set()
+            raise SystemExit
+
+        watcher = threading.Thread(target=watch, args=(self.args, self.site, on_rebuild, 0.01), daemon=True)
+        watcher.start()
+        self.assertFalse(rebuilt.wait(0.2))
+        self.assertTrue(watcher.is_alive())
+
+        self.write(self.site.template_path, "fixed {{ Title }}")
+        self.assertTrue(rebuilt.wait(5))
+        watcher.join(5)
+        self.assertEqual("fixed Home", self.read("index.html"))
+
+
+if __name__ == "__main__":
+    unittest.main()
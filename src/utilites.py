@@ -1,22 +1,52 @@
 import os
 import shutil
 
+from manifest import file_hash
 
-def copy_directory(source_path, destination_path):
+
+def sync_directory(source_path, destination_path, manifest=None, use_hash=False):
     if not os.path.exists(source_path):
         raise Exception("Source directory does not exist")
 
-    if os.path.exists(destination_path):
-        shutil.rmtree(destination_path)
-    os.mkdir(destination_path)
+    synced = []
+    _sync_files(source_path, destination_path, use_hash, synced)
+
+    # Only files this function copied before are removed, so generated pages survive.
+    if manifest is not None:
+        for path in sorted(set(manifest.assets) - set(synced)):
+            if os.path.exists(path):
+                os.remove(path)
+                print(f"Removed stale asset {path}")
+        manifest.assets = synced
+    return synced
+
+
+def _sync_files(source_path, destination_path, use_hash, synced):
+    if not os.path.exists(destination_path):
+        os.makedirs(destination_path)
 
-    contents = os.listdir(source_path)
-    for item in contents:
+    for item in sorted(os.listdir(source_path)):
         item_src_path = os.path.join(source_path, item)
         item_dest_path = os.path.join(destination_path, item)
         if os.path.isfile(item_src_path):
-            shutil.copy(item_src_path, item_dest_path)
-            print(f"Source: {item_src_path}; Destination: {item_dest_path}")
+            if not _same_file(item_src_path, item_dest_path, use_hash):
+                shutil.copy2(item_src_path, item_dest_path)
+                print(f"Source: {item_src_path}; Destination: {item_dest_path}")
+            synced.append(os.path.relpath(item_dest_path))
         else:
-            os.mkdir(item_dest_path)
-            copy_directory(item_src_path, item_dest_path)
+            _sync_files(item_src_path, item_dest_path, use_hash, synced)
+
+
+def _same_file(source_path, destination_path, use_hash):
+    try:
+        dest_stat = os.stat(destination_path)
+    except FileNotFoundError:
+        return False
+
+    src_stat = os.stat(source_path)
+    if src_stat.st_size != dest_stat.st_size:
+        return False
+    if use_hash:
+        return file_hash(source_path) == file_hash(destination_path)
+    # copy2 preserves mtimes, so equal mtimes mean the copy is current.
+    return src_stat.st_mtime_ns == dest_stat.st_mtime_ns
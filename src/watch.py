@@ -0,0 +1,266 @@
+import os
+import time
+from collections import OrderedDict
+
+from fragment_cache import FragmentCache
+from main import build, page_filters, update_search_index
+from page_generation import generate_page, generate_pages_recursive, page_for_source
+from templates import load_template
+from utilites import sync_directory
+
+
+class Watcher:
+    # Polls for changes without statting every file and directory each time. Each poll stats
+    # the watched roots, the recently changed files and directories, and the next batch_size
+    # of the rest in turn; a directory whose mtime moved is listed again to find added and
+    # removed files. Edits to recently changed files and new pages at the top of a watched
+    # directory are seen on the next poll, but on a site with N files and directories, a
+    # change to one that has not changed lately can take up to N / batch_size polls to be
+    # noticed. In exchange a poll costs about batch_size stats however large the site is.
+    def __init__(self, paths, batch_size=2000, recent_size=32):
+        self.paths = list(paths)
+        self.batch_size = batch_size
+        self.recent_size = recent_size
+        self._scan()
+
+    def _scan(self):
+        self.scanned_paths = list(self.paths)
+        # Path -> (mtime_ns, size) of every watched file.
+        self.snapshot = {}
+        # Directory -> (mtime_ns, file paths, directory paths) as of its last listing.
+        self.directories = {}
+        # Most recently changed files and directories, checked on every poll.
+        self.recent = OrderedDict()
+        self.order = None
+        self.cursor = 0
+        for path in self.paths:
+            self._check_root(path, [], [])
+        self.recent.clear()
+
+    def poll(self):
+        # Returns the files that were added or modified, and the files that were removed.
+        if self.paths != self.scanned_paths:
+            previous = self.snapshot
+            self._scan()
+            changed = [path for path, stat in self.snapshot.items() if previous.get(path) != stat]
+            removed = [path for path in previous if path not in self.snapshot]
+            return sorted(changed), sorted(removed)
+
+        changed = []
+        removed = []
+        for path in self.paths:
+            self._check_root(path, changed, removed)
+        for path in list(self.recent) + self._next_batch():
+            if path in self.directories:
+                self._check_directory(path, changed, removed)
+            elif path in self.snapshot:
+                self._check_file(path, changed, removed)
+        return sorted(set(changed)), sorted(set(removed))
+
+    def _check_root(self, path, changed, removed):
+        if os.path.isdir(path):
+            self._check_directory(path, changed, removed)
+            return
+        if path in self.directories:
+            self._forget_directory(path, removed)
+        if os.path.isfile(path) or path in self.snapshot:
+            self._check_file(path, changed, removed)
+
+    def _check_directory(self, path, changed, removed):
+        known = self.directories.get(path)
+        if known is not None:
+            try:
+                if os.stat(path).st_mtime_ns == known[0]:
+                    return
+            except FileNotFoundError:
+                # Dropped when its parent is listed again, or by _check_root for a root.
+                return
+        self._list_directory(path, changed, removed)
+
+    def _list_directory(self, path, changed, removed):
+        # The mtime is read before listing, so a change made during the listing shows up again.
+        # A directory removed meanwhile is left to its parent's listing, or the next poll.
+        _, old_files, old_directories = self.directories.get(path, (None, set(), set()))
+        files = set()
+        directories = set()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        directories.add(entry.path)
+                        if entry.path not in self.directories:
+                            self._list_directory(entry.path, changed, removed)
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    files.add(entry.path)
+                    self._update(entry.path, (stat.st_mtime_ns, stat.st_size), changed)
+        except FileNotFoundError:
+            return
+        for file_path in old_files - files:
+            self._remove(file_path, removed)
+        for directory in old_directories - directories:
+            self._forget_directory(directory, removed)
+        if path not in self.directories:
+            self.order = None
+        self.directories[path] = (mtime, files, directories)
+        self._mark_recent(path)
+
+    def _forget_directory(self, path, removed):
+        _, files, directories = self.directories.pop(path)
+        self.recent.pop(path, None)
+        self.order = None
+        for file_path in files:
+            self._remove(file_path, removed)
+        for directory in directories:
+            if directory in self.directories:
+                self._forget_directory(directory, removed)
+
+    def _check_file(self, path, changed, removed):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            # Files inside a directory are dropped once the directory is listed again.
+            if path in self.paths:
+                self._remove(path, removed)
+            return
+        self._update(path, (stat.st_mtime_ns, stat.st_size), changed)
+
+    def _update(self, path, stat, changed):
+        if self.snapshot.get(path) == stat:
+            return
+        if path not in self.snapshot:
+            self.order = None
+        self.snapshot[path] = stat
+        changed.append(path)
+        self._mark_recent(path)
+
+    def _remove(self, path, removed):
+        if self.snapshot.pop(path, None) is not None:
+            removed.append(path)
+            self.recent.pop(path, None)
+            self.order = None
+
+    def _mark_recent(self, path):
+        self.recent[path] = True
+        self.recent.move_to_end(path)
+        while len(self.recent) > self.recent_size:
+            self.recent.popitem(last=False)
+
+    def _next_batch(self):
+        # Rebuilt only when files or directories come or go.
+        if self.order is None:
+            self.order = list(self.directories) + list(self.snapshot)
+        if len(self.order) <= self.batch_size:
+            return self.order
+        self.cursor %= len(self.order)
+        batch = self.order[self.cursor:self.cursor + self.batch_size]
+        self.cursor += self.batch_size
+        return batch
+
+
+def watch(args, site, on_rebuild, interval=0.05, save_delay=1.0):
+    # A failed build is reported and watching goes on; the next change tries again.
+    manifest = None
+    try:
+        manifest = full_build(args, site)
+    except Exception as error:
+        print(f"Build failed: {error}")
+    cache = None
+    if not args.no_cache:
+        cache = FragmentCache(site.cache_path, max_bytes=args.cache_size * 1024 * 1024)
+
+    watcher = Watcher(_watched_paths(site))
+    last_change = None
+    print(f"Watching {site.content_path}, {site.static_path} and {site.template_path} for changes...")
+    while True:
+        time.sleep(interval)
+        changed, removed = watcher.poll()
+        if not changed and not removed:
+            # The manifest is saved once edits settle rather than after every rebuild.
+            if manifest is not None and last_change is not None and time.monotonic() - last_change > save_delay:
+                manifest.save()
+                last_change = None
+            continue
+
+        start = time.perf_counter()
+        try:
+            if manifest is None:
+                manifest = full_build(args, site)
+                rebuilt_all = True
+            else:
+                rebuilt_all = rebuild(args, site, manifest, cache, changed, removed)
+        except Exception as error:
+            print(f"Rebuild failed: {error}")
+            continue
+        finally:
+            last_change = time.monotonic()
+        if rebuilt_all:
+            watcher.paths = _watched_paths(site)
+        print(f"Rebuilt in {(time.perf_counter() - start) * 1000:.1f} ms")
+        on_rebuild()
+
+
+def full_build(args, site):
+    manifest = build(args, site)
+    # --force applies to the first build only.
+    manifest.force = False
+    return manifest
+
+
+def rebuild(args, site, manifest, cache, changed, removed):
+    # Rebuilds only what the changed files affect; returns True if a full build was needed.
+    manifest.begin_build()
+    static_prefix = site.static_path + os.sep
+    content_prefix = site.content_path + os.sep
+
+    if any(path.startswith(static_prefix) for path in changed + removed):
+        sync_directory(site.static_path, site.public_path, manifest, args.hash_assets)
+    filters = page_filters(args, site, manifest)
+
+    sources = set()
+    for path in changed + removed:
+        if path.startswith(static_prefix):
+            # Pages that point at a fingerprinted copy of the file need the new name.
+            sources.update(manifest.dependents(path))
+            continue
+        if path.startswith(content_prefix) and not os.path.basename(path).startswith("_"):
+            if path in removed:
+                manifest.forget(path)
+            else:
+                sources.add(path)
+            continue
+
+        # Templates, layouts and partials: rebuild exactly the pages built from them.
+        # A file no page depends on yet may be a new layout, so fall back to a full build.
+        dependents = manifest.dependents(path)
+        if not dependents or path in removed:
+            generate_pages_recursive(
+                site.content_path, site.template_path, site.public_path, manifest, args.jobs, cache,
+                filters=filters, index_search=args.search_index,
+            )
+            manifest.prune()
+            update_search_index(args, site, manifest)
+            return True
+        sources.update(dependents)
+
+    for source in sorted(sources):
+        page = page_for_source(site.content_path, site.template_path, site.public_path, os.path.abspath(source))
+        print(f"Generating page from {page[0]} to {page[2]} using {page[1]}")
+        stats = generate_page(*page, cache=cache, filters=filters, index_search=args.search_index)
+        manifest.record(*page, stats["output_hash"], stats["links"], stats["assets"], stats["search"])
+    update_search_index(args, site, manifest)
+    return False
+
+
+def _watched_paths(site):
+    paths = [site.content_path, site.static_path]
+    try:
+        paths.extend(load_template(site.template_path).dependencies)
+    except Exception:
+        # A missing or broken template is watched so that fixing it triggers a build.
+        paths.append(site.template_path)
+    return paths